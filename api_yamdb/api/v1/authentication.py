@@ -0,0 +1,173 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import (AuthenticationFailed,
+                                                 InvalidToken)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from users.models import CustomUser
+
+# Поля пользователя, нужные аутентификации и проверкам прав, в порядке
+# полей модели (этого требует Model.from_db); остальные поля
+# загружаются из базы при первом обращении.
+CACHED_FIELDS = ('id', 'is_superuser', 'is_staff', 'is_active', 'username',
+                 'role')
+# Поля пользователя, восстанавливаемые из утверждений токена.
+CLAIM_FIELDS = ('id', 'is_active', 'username', 'role')
+ROLE_CLAIM = 'role'
+USERNAME_CLAIM = 'username'
+VERSION_CLAIM = 'ver'
+
+_generation = 0
+
+
+def user_cache():
+    config = getattr(settings, 'AUTH_USER_CACHE', {})
+    return caches[config.get('ALIAS', 'default')], config.get('TIMEOUT', 60)
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{_generation}:{user_id}'
+
+
+def forget_user(user_id):
+    """Убирает пользователя из кэша аутентификации."""
+    cache, _timeout = user_cache()
+    cache.delete(user_cache_key(user_id))
+
+
+def forget_all_users():
+    """Делает недействительными все записи кэша аутентификации
+    этого процесса, например после flush базы.
+    """
+    global _generation
+    _generation += 1
+
+
+def token_claims_config():
+    return {'ENABLED': False, 'VERSION_TTL': 60, 'MAX_USERS': 100_000,
+            **getattr(settings, 'TOKEN_CLAIMS_AUTH', {})}
+
+
+def access_token_for(user):
+    """Access-токен пользователя; в режиме TOKEN_CLAIMS_AUTH в нём
+    также роль и версия токенов пользователя.
+    """
+    token = AccessToken.for_user(user)
+    if token_claims_config()['ENABLED']:
+        token[ROLE_CLAIM] = user.role
+        token[USERNAME_CLAIM] = user.username
+        token[VERSION_CLAIM] = user.token_version
+    return token
+
+
+class TokenVersions:
+    """Версии токенов пользователей в памяти процесса.
+
+    Версия растёт при смене роли и активности пользователя (см.
+    CustomUser.save). Изменения в этом процессе сбрасывают запись сразу
+    (см. api.v1.signals), изменения в других процессах становятся видны
+    не позже чем через ttl секунд.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id, ttl, max_users):
+        """Текущая версия токенов; None для удалённых
+        и неактивных пользователей.
+        """
+        entry = self._versions.get(user_id)
+        now = time.monotonic()
+        if entry is not None and entry[1] > now:
+            return entry[0]
+        version = CustomUser.objects.filter(
+            pk=user_id, is_active=True
+        ).values_list('token_version', flat=True).first()
+        with self._lock:
+            self._versions.pop(user_id, None)
+            while self._versions and len(self._versions) >= max_users:
+                del self._versions[next(iter(self._versions))]
+            self._versions[user_id] = (version, now + ttl)
+        return version
+
+    def forget(self, user_id):
+        with self._lock:
+            self._versions.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._versions.clear()
+
+
+token_versions = TokenVersions()
+
+
+def forget_users(user_ids):
+    """Сбрасывает кэш аутентификации и версии токенов пользователей
+    после queryset.update и bulk_create, которые не отправляют сигналы.
+    """
+    cache, _timeout = user_cache()
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+    for user_id in user_ids:
+        token_versions.forget(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT-аутентификация, которая берёт пользователя из кэша
+    с коротким временем жизни вместо запроса к базе на каждый запрос.
+    Кэш сбрасывается при сохранении и удалении пользователя
+    (см. api.v1.signals).
+
+    В режиме TOKEN_CLAIMS_AUTH пользователь восстанавливается из роли
+    в токене, а из памяти процесса сверяется только версия токенов.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification')
+            )
+        config = token_claims_config()
+        if (config['ENABLED'] and ROLE_CLAIM in validated_token
+                and VERSION_CLAIM in validated_token):
+            return self.get_claims_user(user_id, validated_token, config)
+        cache, timeout = user_cache()
+        key = user_cache_key(user_id)
+        values = cache.get(key)
+        if values is None:
+            values = CustomUser.objects.filter(
+                **{api_settings.USER_ID_FIELD: user_id}
+            ).values_list(*CACHED_FIELDS).first()
+            if values is None:
+                raise AuthenticationFailed(_('User not found'),
+                                           code='user_not_found')
+            cache.set(key, values, timeout)
+        user = CustomUser.from_db(DEFAULT_DB_ALIAS, CACHED_FIELDS, values)
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'),
+                                       code='user_inactive')
+        return user
+
+    def get_claims_user(self, user_id, validated_token, config):
+        version = token_versions.get(user_id, config['VERSION_TTL'],
+                                     config['MAX_USERS'])
+        if version is None:
+            raise AuthenticationFailed(_('User not found'),
+                                       code='user_not_found')
+        if version != validated_token[VERSION_CLAIM]:
+            raise AuthenticationFailed('Токен устарел, получите новый',
+                                       code='token_stale')
+        return CustomUser.from_db(DEFAULT_DB_ALIAS, CLAIM_FIELDS, (
+            user_id, True, validated_token.get(USERNAME_CLAIM, ''),
+            validated_token[ROLE_CLAIM],
+        ))
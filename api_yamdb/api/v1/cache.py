@@ -0,0 +1,273 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from rest_framework.response import Response
+
+MISSING = object()
+# Поколение, общее для всех моделей: его смена сбрасывает весь кэш.
+EPOCH = '*'
+
+
+class CacheGenerations:
+    """Поколения моделей и время их изменения в кэше Django.
+
+    Хранятся в общем кэше, чтобы изменение, сделанное в одном процессе
+    (другой воркер, команда управления), сбрасывало ответы во всех.
+    Поколение — случайная метка, а не счётчик: после перезапуска или
+    потери ключа прежние значения не повторяются. clear() меняет эпоху,
+    входящую во все поколения.
+    """
+
+    def __init__(self, alias='default', key_prefix='response'):
+        self.alias = alias
+        self.key_prefix = key_prefix
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _generation_key(self, name):
+        return f'{self.key_prefix}:generation:{name}'
+
+    def _changed_at_key(self, name):
+        return f'{self.key_prefix}:changed_at:{name}'
+
+    @staticmethod
+    def _token():
+        return uuid.uuid4().hex[:12]
+
+    def get(self, names):
+        keys = [self._generation_key(name) for name in (EPOCH, *names)]
+        values = self.cache.get_many(keys)
+        for key in keys:
+            if key not in values:
+                self.cache.add(key, self._token(), None)
+                values[key] = self.cache.get(key)
+        return tuple(values[key] for key in keys)
+
+    def changed_at(self, names):
+        keys = [self._changed_at_key(name) for name in names]
+        return list(self.cache.get_many(keys).values())
+
+    def bump(self, name):
+        self.cache.set_many({
+            self._generation_key(name): self._token(),
+            self._changed_at_key(name): time.time(),
+        }, None)
+
+    def clear(self):
+        self.cache.set(self._generation_key(EPOCH), self._token(), None)
+
+
+class LRUCacheBackend:
+    """Кэш ответов в памяти процесса с вытеснением давно
+    не использованных записей при превышении max_entries и временем
+    жизни записи timeout секунд; поколения — в общем кэше alias.
+    """
+
+    def __init__(self, max_entries=1024, timeout=60, alias='default',
+                 key_prefix='response'):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.evictions = 0
+        self.generations = CacheGenerations(alias, key_prefix)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            expires, value = self._data.get(key, (None, MISSING))
+            if value is MISSING:
+                return MISSING
+            if expires <= time.monotonic():
+                del self._data[key]
+                return MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires = time.monotonic() + self.timeout
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_generations(self, names):
+        return self.generations.get(names)
+
+    def get_changed_at(self, names):
+        return self.generations.changed_at(names)
+
+    def bump_generation(self, name):
+        self.generations.bump(name)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+        self.generations.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class DjangoCacheBackend:
+    """Хранит ответы и поколения в кэше Django (например, общем
+    memcached или redis для нескольких процессов).
+    """
+
+    def __init__(self, alias='default', timeout=300,
+                 key_prefix='response'):
+        self.alias = alias
+        self.timeout = timeout
+        self.key_prefix = key_prefix
+        self.evictions = 0
+        self.generations = CacheGenerations(alias, key_prefix)
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(f'{self.key_prefix}:{key}', MISSING)
+
+    def set(self, key, value):
+        self.cache.set(f'{self.key_prefix}:{key}', value, self.timeout)
+
+    def get_generations(self, names):
+        return self.generations.get(names)
+
+    def get_changed_at(self, names):
+        return self.generations.changed_at(names)
+
+    def bump_generation(self, name):
+        self.generations.bump(name)
+
+    def clear(self):
+        self.generations.clear()
+
+    def __len__(self):
+        return 0
+
+
+class ResponseCache:
+    """Кэш данных ответов с ключами, зависящими от поколений моделей.
+
+    Изменение модели меняет её поколение, поэтому старые ключи
+    перестают запрашиваться и вытесняются, а явная очистка не нужна.
+    Изменения в обход сигналов моделей (QuerySet.update(), bulk_update)
+    сбрасывают кэш через сигнал reviews.signals.rows_updated или
+    перестают отдаваться по истечении времени жизни записи.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, request, models):
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+        )
+        generations = self.backend.get_generations(models)
+        return '|'.join((
+            request.get_host(),
+            request.path,
+            urlencode(params),
+            ','.join(map(str, generations)),
+        ))
+
+    def generations(self, models):
+        return self.backend.get_generations(models)
+
+    def changed_at(self, models):
+        """Время последнего изменения моделей, замеченного кэшем,
+        или None.
+        """
+        return max(self.backend.get_changed_at(models), default=None)
+
+    def get(self, key):
+        value = self.backend.get(key)
+        with self._lock:
+            if value is MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self.backend.set(key, value)
+
+    def bump(self, model_name):
+        self.backend.bump_generation(model_name)
+
+    def clear(self):
+        self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        """Счётчики попаданий, промахов и вытеснений."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.backend.evictions,
+            'size': len(self.backend),
+        }
+
+
+def create_response_cache():
+    config = getattr(settings, 'RESPONSE_CACHE', {})
+    backend_class = import_string(
+        config.get('BACKEND', 'api.v1.cache.LRUCacheBackend')
+    )
+    return ResponseCache(backend_class(**config.get('OPTIONS', {})))
+
+
+response_cache = create_response_cache()
+
+
+class CachedResponseMixin:
+    """Базовый миксин кэширования данных ответов вьюсета.
+
+    ``cache_models`` — метки моделей, от которых зависит ответ;
+    их изменение сбрасывает кэш вьюсета (см. api.v1.signals).
+    """
+    cache_models = ()
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        key = response_cache.make_key(request, self.cache_models)
+        data = response_cache.get(key)
+        if data is not MISSING:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response_cache.set(key, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class CachedListMixin(CachedResponseMixin):
+    """Кэширует ответы list."""
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+
+class CachedRetrieveMixin(CachedResponseMixin):
+    """Кэширует ответы retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
@@ -0,0 +1,155 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.http import Http404
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from api.v1.cache import MISSING, response_cache
+
+
+def is_conditional(request):
+    return ('HTTP_IF_NONE_MATCH' in request.META
+            or 'HTTP_IF_MODIFIED_SINCE' in request.META)
+
+
+class ConditionalGetMixin:
+    """Базовый миксин условных GET запросов (If-None-Match,
+    If-Modified-Since).
+
+    Валидаторы считаются без сериализации ответа: по поколениям моделей
+    ``validator_models`` (по умолчанию ``cache_models``, см. api.v1.cache)
+    и, при необходимости, по агрегату из get_validator_aggregate.
+    """
+    validator_models = None
+
+    def get_validator_models(self):
+        if self.validator_models is not None:
+            return self.validator_models
+        return getattr(self, 'cache_models', ())
+
+    def get_validator_aggregate(self):
+        """Дополнительные части валидатора и время последнего изменения
+        данных (timestamp или None).
+        """
+        return (), None
+
+    def get_validators(self, request):
+        models = self.get_validator_models()
+        parts, last_modified = self.get_validator_aggregate()
+        changed_at = response_cache.changed_at(models)
+        if changed_at is not None:
+            last_modified = max(last_modified or 0, changed_at)
+        source = '|'.join(map(str, (
+            request.get_full_path(),
+            request.accepted_renderer.format,
+            *response_cache.generations(models),
+            *parts,
+        )))
+        etag = hashlib.md5(source.encode('utf-8')).hexdigest()
+        if last_modified is not None:
+            last_modified = int(last_modified)
+        return etag, last_modified
+
+    def check_conditional_target(self):
+        """Для условного запроса проверяет, что запрошенный объект
+        существует: иначе «If-None-Match: *» получил бы 304 вместо 404.
+        """
+        if self.action == 'retrieve':
+            self.get_object()
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        if is_conditional(request):
+            self.check_conditional_target()
+        not_modified = get_conditional_response(
+            request._request, etag=quote_etag(etag),
+            last_modified=last_modified,
+        )
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = quote_etag(etag)
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+
+class ConditionalListMixin(ConditionalGetMixin):
+    """Условные запросы для list."""
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs
+        )
+
+
+class ConditionalRetrieveMixin(ConditionalGetMixin):
+    """Условные запросы для retrieve."""
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class UpdatedAtValidatorMixin:
+    """Валидатор по числу объектов и max(updated_at): один агрегирующий
+    запрос по индексу вместо выборки и сериализации страницы. Дата
+    изменения меняется и при редактировании, и при добавлении объекта,
+    а удаление меняет их число.
+
+    Условный запрос всегда сверяется с базой. Для безусловного запроса
+    агрегат нужен только ради заголовков, поэтому берётся из кэша
+    ответов, пока не изменились поколения моделей: устаревший ETag
+    в таких заголовках приводит лишь к лишнему ответу 200, но не к 304.
+
+    get_validator_queryset должен возвращать объекты коллекции без
+    проверки существования родительских объектов: она нужна, только
+    если агрегат не нашёл ни одного объекта.
+    """
+    validator_count = None
+
+    def get_validator_queryset(self):
+        raise NotImplementedError
+
+    def check_conditional_target(self):
+        if self.validator_count:
+            return
+        if self.action == 'retrieve':
+            raise Http404
+        # Пустая коллекция: get_queryset ответит 404, если нет
+        # родительского объекта.
+        self.get_queryset()
+
+    def get_validator_aggregate(self):
+        request = self.request
+        if is_conditional(request):
+            aggregate = self.query_validator_aggregate()
+            self.validator_count = aggregate[0][0]
+            return aggregate
+        key = 'validators|' + response_cache.make_key(
+            request, self.get_validator_models()
+        )
+        aggregate = response_cache.backend.get(key)
+        if aggregate is MISSING:
+            aggregate = self.query_validator_aggregate()
+            response_cache.backend.set(key, aggregate)
+        return aggregate
+
+    def query_validator_aggregate(self):
+        queryset = self.get_validator_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if lookup_url_kwarg in self.kwargs:
+            queryset = queryset.filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        aggregate = queryset.order_by().aggregate(
+            count=Count('pk'), last=Max('updated_at')
+        )
+        last = aggregate['last']
+        return (
+            (aggregate['count'], last and last.isoformat()),
+            last and last.timestamp(),
+        )
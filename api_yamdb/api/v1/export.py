@@ -0,0 +1,51 @@
+import json
+import zlib
+from itertools import islice
+
+from reviews.models import Title
+
+EXPORT_CHUNK_SIZE = 2000
+TITLE_FIELDS = ('id', 'name', 'year', 'description', 'rating',
+                'category__slug')
+
+
+def title_records(chunk_size=EXPORT_CHUNK_SIZE):
+    """Построчно выдаёт произведения в формате NDJSON.
+
+    Произведения читаются через iterator(chunk_size), жанры — одним
+    запросом на каждую порцию, поэтому память не зависит от размера
+    каталога.
+    """
+    rows = Title.objects.order_by('pk').values_list(
+        *TITLE_FIELDS
+    ).iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        genres = {}
+        links = Title.genre.through.objects.filter(
+            title_id__in=[row[0] for row in chunk]
+        ).order_by('genre__slug').values_list('title_id', 'genre__slug')
+        for title_id, slug in links:
+            genres.setdefault(title_id, []).append(slug)
+        for pk, name, year, description, rating, category in chunk:
+            yield json.dumps({
+                'id': pk,
+                'name': name,
+                'year': year,
+                'description': description,
+                'rating': rating,
+                'category': category,
+                'genre': genres.get(pk, []),
+            }, ensure_ascii=False) + '\n'
+
+
+def gzip_stream(chunks):
+    """Сжимает поток строк gzip по мере их появления."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
@@ -1,18 +1,80 @@
 import django_filters
+from rest_framework import filters
 
-from reviews.models import Title
+from reviews.models import Category, Title
+from reviews.search import filter_titles_by_name, search_titles
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    """Список значений через запятую."""
 
 
 class TitleFilter(django_filters.FilterSet):
-    """Фильтр для модели Title."""
-    name = django_filters.CharFilter(
-        field_name='name',
-        lookup_expr='icontains',
-    )
+    """Фильтр для модели Title.
+
+    Жанры и категории проверяются подзапросами ``id IN (SELECT ...)``:
+    они не размножают строки произведений, поэтому выдаче и подсчёту
+    для пагинации не нужен DISTINCT.
+    """
+    name = django_filters.CharFilter(method='filter_name')
     year = django_filters.NumberFilter(field_name='year')
-    genre = django_filters.CharFilter(field_name='genre__slug')
+    year_min = django_filters.NumberFilter(
+        field_name='year', lookup_expr='gte', label='Год не раньше'
+    )
+    year_max = django_filters.NumberFilter(
+        field_name='year', lookup_expr='lte', label='Год не позже'
+    )
+    genre = CharInFilter(method='filter_genre', label='Жанры')
+    genre_match = django_filters.ChoiceFilter(
+        choices=(('any', 'Любой из жанров'), ('all', 'Все жанры')),
+        method='filter_genre_match', label='Совпадение жанров',
+    )
     category = django_filters.CharFilter(field_name='category__slug')
+    category__in = CharInFilter(method='filter_category_in',
+                                label='Категории')
+    rating_min = django_filters.NumberFilter(
+        field_name='rating', lookup_expr='gte', label='Рейтинг не ниже'
+    )
 
     class Meta:
         model = Title
         fields = ('name', 'year', 'genre', 'category')
+
+    def filter_name(self, queryset, name, value):
+        return filter_titles_by_name(queryset, value)
+
+    def filter_genre(self, queryset, name, value):
+        slugs = [slug for slug in value if slug]
+        if not slugs:
+            return queryset
+        titles = Title.genre.through.objects.values('title_id')
+        if self.form.cleaned_data.get('genre_match') == 'all':
+            for slug in set(slugs):
+                queryset = queryset.filter(
+                    pk__in=titles.filter(genre__slug=slug)
+                )
+            return queryset
+        return queryset.filter(pk__in=titles.filter(genre__slug__in=slugs))
+
+    def filter_genre_match(self, queryset, name, value):
+        # Учитывается в filter_genre.
+        return queryset
+
+    def filter_category_in(self, queryset, name, value):
+        slugs = [slug for slug in value if slug]
+        if not slugs:
+            return queryset
+        return queryset.filter(
+            category__in=Category.objects.filter(slug__in=slugs)
+        )
+
+
+class TitleSearchFilter(filters.BaseFilterBackend):
+    """Полнотекстовый поиск по названию и описанию произведений
+    с сортировкой по релевантности.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return search_titles(queryset, query)
@@ -0,0 +1,218 @@
+import itertools
+import threading
+from bisect import bisect_left
+from collections import Counter
+
+# Границы корзин гистограмм: длительности в секундах, размеры в байтах.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+EVENTS = {
+    'signups': 'Число регистраций и повторных запросов кода подтверждения.',
+    'tokens_issued': 'Число выданных JWT-токенов.',
+}
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами."""
+
+    def __init__(self, buckets=DURATION_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other):
+        for index, count in enumerate(list(other.counts)):
+            self.counts[index] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def cumulative(self):
+        """Пары (верхняя граница, число замеров не больше неё)."""
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class Shard:
+    """Метрики, накопленные потоками одной полосы."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = Counter()
+        self.durations = {}
+        self.sizes = {}
+        self.queries = Counter()
+        self.events = Counter()
+
+
+class RequestStats:
+    """Метрики запросов по маршрутам и обработчикам.
+
+    Потоки по очереди закрепляются за одной из stripes полос, у каждой
+    своя блокировка, поэтому потоки почти не ждут друг друга, а число
+    полос и стоимость сбора снимка не растут с числом потоков.
+    """
+
+    def __init__(self, stripes=16):
+        self._local = threading.local()
+        self._next_stripe = itertools.count()
+        self._shards = [Shard() for _ in range(stripes)]
+
+    def _shard(self):
+        index = getattr(self._local, 'stripe', None)
+        if index is None:
+            index = self._local.stripe = (
+                next(self._next_stripe) % len(self._shards)
+            )
+        return self._shards[index]
+
+    def observe(self, timings):
+        shard = self._shard()
+        key = (timings.route, timings.view)
+        with shard.lock:
+            shard.requests[key + (str(timings.status),)] += 1
+            shard.queries[key] += timings.queries
+            for phase, duration in timings.durations.items():
+                histogram = shard.durations.get(key + (phase,))
+                if histogram is None:
+                    histogram = shard.durations[key + (phase,)] = Histogram()
+                histogram.observe(duration)
+            if timings.size is not None:
+                histogram = shard.sizes.get(key)
+                if histogram is None:
+                    histogram = shard.sizes[key] = Histogram(SIZE_BUCKETS)
+                histogram.observe(timings.size)
+
+    def increment(self, event):
+        shard = self._shard()
+        with shard.lock:
+            shard.events[event] += 1
+
+    def _merged(self, name):
+        merged = {}
+        for shard in self._shards:
+            with shard.lock:
+                for key, value in getattr(shard, name).items():
+                    if isinstance(value, Histogram):
+                        if key not in merged:
+                            merged[key] = Histogram(value.buckets)
+                        merged[key].merge(value)
+                    else:
+                        merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def requests(self):
+        """{(маршрут, обработчик, статус): число запросов}."""
+        return self._merged('requests')
+
+    def histograms(self):
+        """{(маршрут, обработчик, этап): Histogram длительностей}."""
+        return self._merged('durations')
+
+    def sizes(self):
+        """{(маршрут, обработчик): Histogram размеров ответов}."""
+        return self._merged('sizes')
+
+    def queries(self):
+        """{(маршрут, обработчик): число запросов к базе}."""
+        return self._merged('queries')
+
+    def events(self):
+        return self._merged('events')
+
+    def clear(self):
+        for shard in self._shards:
+            with shard.lock:
+                shard.reset()
+
+
+request_stats = RequestStats()
+
+
+def escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def labels(**values):
+    return '{' + ','.join(
+        f'{name}="{escape(value)}"' for name, value in values.items()
+    ) + '}'
+
+
+def format_bound(bound):
+    return '+Inf' if bound == float('inf') else str(bound)
+
+
+def metric_header(name, kind, help_text):
+    return [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+
+
+def histogram_lines(name, key_names, histograms):
+    lines = []
+    for key, histogram in sorted(histograms.items()):
+        values = dict(zip(key_names, key))
+        for bound, count in histogram.cumulative():
+            lines.append(f'{name}_bucket'
+                         f'{labels(**values, le=format_bound(bound))} {count}')
+        lines.append(f'{name}_sum{labels(**values)} {histogram.sum}')
+        lines.append(f'{name}_count{labels(**values)} {histogram.count}')
+    return lines
+
+
+def render_metrics():
+    """Метрики в текстовом формате Prometheus."""
+    from api.v1.cache import response_cache
+
+    lines = metric_header('yamdb_requests_total', 'counter',
+                          'Число обработанных запросов.')
+    for (route, view, status), count in sorted(
+            request_stats.requests().items()):
+        lines.append(f'yamdb_requests_total'
+                     f'{labels(route=route, view=view, status=status)} '
+                     f'{count}')
+    lines += metric_header('yamdb_request_duration_seconds', 'histogram',
+                           'Время этапов обработки запроса.')
+    lines += histogram_lines('yamdb_request_duration_seconds',
+                             ('route', 'view', 'phase'),
+                             request_stats.histograms())
+    lines += metric_header('yamdb_response_size_bytes', 'histogram',
+                           'Размер тела ответа.')
+    lines += histogram_lines('yamdb_response_size_bytes', ('route', 'view'),
+                             request_stats.sizes())
+    lines += metric_header('yamdb_db_queries_total', 'counter',
+                           'Число SQL-запросов к базе.')
+    for (route, view), count in sorted(request_stats.queries().items()):
+        lines.append(f'yamdb_db_queries_total'
+                     f'{labels(route=route, view=view)} {count}')
+    cache = response_cache.stats()
+    for name in ('hits', 'misses', 'evictions'):
+        metric = f'yamdb_response_cache_{name}_total'
+        lines += metric_header(metric, 'counter', f'Кэш ответов: {name}.')
+        lines.append(f'{metric} {cache[name]}')
+    lookups = cache['hits'] + cache['misses']
+    lines += metric_header('yamdb_response_cache_hit_ratio', 'gauge',
+                           'Доля попаданий в кэш ответов.')
+    lines.append('yamdb_response_cache_hit_ratio '
+                 f'{cache["hits"] / lookups if lookups else 0}')
+    lines += metric_header('yamdb_response_cache_entries', 'gauge',
+                           'Число записей в кэше ответов.')
+    lines.append(f'yamdb_response_cache_entries {cache["size"]}')
+    events = request_stats.events()
+    for event, help_text in EVENTS.items():
+        lines += metric_header(f'yamdb_{event}_total', 'counter', help_text)
+        lines.append(f'yamdb_{event}_total {events.get(event, 0)}')
+    return '\n'.join(lines) + '\n'
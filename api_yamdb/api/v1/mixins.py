@@ -0,0 +1,73 @@
+from functools import lru_cache
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+
+
+def _resolve_relation(model, source):
+    """Возвращает поле связи модели для source сериализатора
+    или None, если source не является связью.
+    """
+    if model is None or '.' in source:
+        return None
+    try:
+        field = model._meta.get_field(source)
+    except FieldDoesNotExist:
+        return None
+    return field if field.is_relation else None
+
+
+def _collect_related(serializer, model, prefix, in_prefetch,
+                     select, prefetch):
+    for field in serializer.fields.values():
+        if field.write_only or field.source == '*':
+            continue
+        relation = _resolve_relation(model, field.source)
+        if relation is None:
+            continue
+        lookup = prefix + field.source
+        single = (relation.many_to_one or relation.one_to_one)
+        nested = field
+        if isinstance(field, serializers.ListSerializer):
+            nested = field.child
+        elif isinstance(field, ManyRelatedField):
+            nested = field.child_relation
+        if isinstance(nested, PrimaryKeyRelatedField) and single:
+            continue
+        if single and not in_prefetch:
+            select.append(lookup)
+        else:
+            prefetch.append(lookup)
+        if isinstance(nested, serializers.Serializer):
+            _collect_related(
+                nested, relation.related_model, lookup + '__',
+                in_prefetch or not single, select, prefetch,
+            )
+
+
+@lru_cache(maxsize=None)
+def related_lookups(serializer_class):
+    """Строит списки select_related и prefetch_related по объявленным
+    в сериализаторе вложенным сериализаторам и полям связей.
+    """
+    select, prefetch = [], []
+    model = getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    _collect_related(serializer_class(), model, '', False, select, prefetch)
+    return tuple(select), tuple(prefetch)
+
+
+class SerializerRelatedQuerysetMixin:
+    """Миксин вьюсета, подгружающий связанные объекты, которые выводит
+    сериализатор, фиксированным числом запросов вместо запроса
+    на каждый объект.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        select, prefetch = related_lookups(self.get_serializer_class())
+        if select:
+            queryset = queryset.select_related(*select)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
@@ -0,0 +1,189 @@
+import json
+from base64 import b64decode, b64encode
+from binascii import Error as BinasciiError
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу (keyset): каждая страница выбирается условием
+    по значениям ключа сортировки последнего объекта предыдущей
+    страницы, без COUNT(*) и OFFSET.
+
+    Ключ сортировки задаётся атрибутом вьюсета ``cursor_ordering``
+    и должен однозначно упорядочивать объекты, например ('-year', 'id').
+    Параметры запроса из ``cursor_incompatible_params`` вьюсета задают
+    собственный порядок выдачи, и вместе с курсором они отклоняются.
+    """
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+    incompatible_param_message = (
+        'Параметр {param} нельзя использовать с пагинацией по курсору'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        for param in getattr(view, 'cursor_incompatible_params', ()):
+            if request.query_params.get(param):
+                raise ParseError(
+                    self.incompatible_param_message.format(param=param)
+                )
+        self.request = request
+        self.ordering = tuple(view.cursor_ordering)
+        self.base_url = request.build_absolute_uri()
+        values, reverse = self.decode_cursor(request)
+        if values is not None:
+            values = self.parse_values(queryset.model, values)
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(self._invert(field) for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(ordering, values))
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next = values is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    @staticmethod
+    def _invert(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def keyset_filter(ordering, values):
+        """Условие «строго после ключа values» для сортировки ordering:
+        a >= x AND ((a > x) OR (a = x AND b > y) OR ...).
+
+        Нестрогая граница по первому полю позволяет базе начать поиск
+        по индексу сразу с позиции курсора, а не просматривать индекс
+        с начала.
+        """
+        condition = Q()
+        equal = Q()
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        first = ordering[0]
+        lookup = 'lte' if first.startswith('-') else 'gte'
+        return Q(**{f'{first.lstrip("-")}__{lookup}': values[0]}) & condition
+
+    def encode_cursor(self, obj, reverse):
+        values = [getattr(obj, field.lstrip('-')) for field in self.ordering]
+        # isoformat() сохраняет микросекунды pub_date, без которых
+        # ключ перестаёт быть точным.
+        payload = json.dumps(
+            {'v': values, 'r': reverse},
+            default=lambda value: value.isoformat(),
+        )
+        cursor = b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, cursor
+        )
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')))
+            values, reverse = payload['v'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError, BinasciiError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def parse_values(self, model, values):
+        """Приводит значения ключа из курсора к типам полей модели."""
+        parsed = []
+        for field, value in zip(self.ordering, values):
+            try:
+                value = model._meta.get_field(
+                    field.lstrip('-')
+                ).to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            parsed.append(value)
+        return parsed
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """Постраничная пагинация с переключением на пагинацию по ключу.
+
+    Пагинация по ключу включается параметром запроса ``?pagination=cursor``
+    (или наличием ``cursor``) либо атрибутом вьюсета
+    ``pagination_mode = 'cursor'``, если у вьюсета задан
+    ``cursor_ordering``.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+    keyset_class = KeysetPagination
+
+    def use_cursor(self, request, view):
+        if not getattr(view, 'cursor_ordering', None):
+            return False
+        params = request.query_params
+        mode = params.get(
+            self.mode_query_param,
+            getattr(view, 'pagination_mode', None),
+        )
+        return (mode == self.cursor_mode
+                or self.keyset_class.cursor_query_param in params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.use_cursor(request, view):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.keyset is not None:
+            return self.keyset.get_previous_link()
+        return super().get_previous_link()
@@ -0,0 +1,150 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from fnmatch import fnmatchcase
+
+from api.v1.timing import route_label
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+
+
+def frame_label(frame):
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(BASE_DIR):
+        filename = os.path.relpath(filename, BASE_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'.replace(
+        ';', ':'
+    )
+
+
+def collapse(frame):
+    """Стек кадра в формате collapsed: от корня к вершине через «;»."""
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+class SamplingProfiler:
+    """Статистический профилировщик запросов в памяти процесса.
+
+    Пока профилирование включено, фоновый поток раз в interval секунд
+    снимает стеки потоков, обрабатывающих отобранные запросы: доля rate
+    запросов, чей маршрут подходит под шаблон route (fnmatch по меткам
+    вида ``titles/{title_id}/reviews``). Выключенный профилировщик
+    стоит одной проверки флага на запрос.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.route = '*'
+        self.rate = 1.0
+        self.interval = 0.005
+        self.deadline = None
+        self.requests = 0
+        self.stacks = Counter()
+        self._threads = set()
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def start(self, route='*', rate=1.0, interval=0.005, duration=300):
+        with self._lock:
+            self.route, self.rate, self.interval = route, rate, interval
+            self.deadline = time.monotonic() + duration
+            self.requests = 0
+            self.stacks = Counter()
+            self.enabled = True
+            if self._sampler is None or not self._sampler.is_alive():
+                self._sampler = threading.Thread(
+                    target=self.run, name='sampling-profiler', daemon=True
+                )
+                self._sampler.start()
+
+    def stop(self):
+        self.enabled = False
+
+    def status(self):
+        remaining = None
+        if self.enabled:
+            remaining = max(0, round(self.deadline - time.monotonic()))
+        return {
+            'enabled': self.enabled,
+            'route': self.route,
+            'rate': self.rate,
+            'interval': self.interval,
+            'remaining': remaining,
+            'requests': self.requests,
+            'samples': sum(self.stacks.values()),
+        }
+
+    def should_sample(self, resolver_match):
+        return (fnmatchcase(route_label(resolver_match), self.route)
+                and random.random() < self.rate)
+
+    def begin(self):
+        with self._lock:
+            self._threads.add(threading.get_ident())
+            self.requests += 1
+
+    def end(self):
+        with self._lock:
+            self._threads.discard(threading.get_ident())
+
+    def sample(self):
+        with self._lock:
+            threads = list(self._threads)
+        frames = sys._current_frames()
+        stacks = [collapse(frames[ident]) for ident in threads
+                  if ident in frames]
+        with self._lock:
+            self.stacks.update(stacks)
+
+    def run(self):
+        while self.enabled:
+            if time.monotonic() > self.deadline:
+                self.stop()
+                break
+            time.sleep(self.interval)
+            if self.enabled:
+                self.sample()
+
+    def collapsed(self):
+        """Накопленные стеки в формате collapsed для flamegraph.pl
+        и speedscope.
+        """
+        with self._lock:
+            stacks = self.stacks.most_common()
+        return ''.join(f'{stack} {count}\n' for stack, count in stacks)
+
+
+profiler = SamplingProfiler()
+
+
+class ProfilingMiddleware:
+    """Отмечает поток запроса для профилировщика, если профилирование
+    включено и запрос попал в выборку.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profiled = False
+        try:
+            return self.get_response(request)
+        finally:
+            if request.profiled:
+                profiler.end()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if profiler.enabled and profiler.should_sample(
+                request.resolver_match):
+            request.profiled = True
+            profiler.begin()
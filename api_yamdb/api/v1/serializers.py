@@ -1,16 +1,25 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
 from rest_framework.relations import SlugRelatedField
+from rest_framework.settings import api_settings
 from rest_framework.validators import UniqueValidator
 
+from api.v1.timing import TimedSerializerMixin
 from api.v1.validators import validate_username_not_me
 from reviews.models import Category, Comment, Genre, Review, Title
 from users.models import CustomUser
 
 err_username_message = 'Пользователь с таким именем уже есть'
 err_email_message = 'Пользователь с таким email уже зарегистрирован'
+err_signup_message = ('Не удалось зарегистрировать пользователя, '
+                      'повторите запрос')
+# Наибольшее число пользователей в одном массовом запросе.
+BULK_LIMIT = 500
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для объектов модели Category."""
 
     name = serializers.CharField(
@@ -25,7 +34,7 @@ class CategorySerializer(serializers.ModelSerializer):
         fields = ('name', 'slug')
 
 
-class GenreSerializer(serializers.ModelSerializer):
+class GenreSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для объектов модели Genre."""
 
     name = serializers.CharField(
@@ -40,7 +49,7 @@ class GenreSerializer(serializers.ModelSerializer):
         fields = ('name', 'slug',)
 
 
-class TitleSerializer(serializers.ModelSerializer):
+class TitleSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для получения объекта модели Title."""
     genre = SlugRelatedField(
         queryset=Genre.objects.all(),
@@ -54,14 +63,13 @@ class TitleSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Title
-        fields = '__all__'
+        exclude = ('rating_sum', 'review_count', 'rating')
 
 
-class TitleListSerializer(serializers.ModelSerializer):
+class TitleListSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для получения списка объектов модели Title."""
     genre = GenreSerializer(many=True)
     category = CategorySerializer()
-    rating = serializers.IntegerField(read_only=True, allow_null=True)
 
     class Meta:
         model = Title
@@ -69,7 +77,7 @@ class TitleListSerializer(serializers.ModelSerializer):
                   'category')
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(read_only=True,
                                           slug_field='username')
     """Сериализатор для отзывов."""
@@ -82,19 +90,25 @@ class ReviewSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError('Проверьте оценку!')
         return value
 
-    def validate(self, data):
-        current_user = self.context['request'].user
-        title_id = self.context['view'].kwargs.get('title_id')
-        if (
-            current_user.reviews.filter(title=title_id).exists()
-            and self.context['request'].method == 'POST'
-        ):
-            raise serializers.ValidationError(
-                'Больше одного отзыва оставлять нельзя')
-        return data
+    def create(self, validated_data):
+        # Один отзыв на произведение гарантирует unique_author_title:
+        # вставка без предварительной проверки не оставляет окна гонки.
+        try:
+            return super().create(validated_data)
+        except IntegrityError:
+            # IntegrityError дают и внешние ключи: о повторном отзыве
+            # сообщаем, только если отзыв автора действительно есть.
+            title_id = validated_data['title_id']
+            if Review.objects.filter(author=validated_data['author'],
+                                     title_id=title_id).exists():
+                raise serializers.ValidationError(
+                    'Больше одного отзыва оставлять нельзя')
+            if not Title.objects.filter(pk=title_id).exists():
+                raise NotFound('Произведение не найдено')
+            raise
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     author = serializers.SlugRelatedField(read_only=True,
                                           slug_field='username')
     """Сериализатор для комментариев."""
@@ -103,7 +117,7 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ('id', 'text', 'author', 'pub_date')
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class CustomUserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для юзеров."""
     username = serializers.CharField(
         validators=[UniqueValidator(
@@ -124,26 +138,200 @@ class CustomUserSerializer(serializers.ModelSerializer):
                   'last_name', 'bio', 'role')
 
 
+class BulkUserListSerializer(serializers.ListSerializer):
+    """Пачка новых пользователей: ошибки возвращаются по строкам,
+    уникальность username и email проверяется одним запросом на пачку.
+    """
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list) or not data:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Ожидается непустой список пользователей']}
+            )
+        if len(data) > BULK_LIMIT:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    f'Не больше {BULK_LIMIT} пользователей за запрос']}
+            )
+        rows, errors = [], []
+        for item in data:
+            try:
+                rows.append(self.child.run_validation(item))
+                errors.append({})
+            except serializers.ValidationError as exc:
+                rows.append(None)
+                errors.append(exc.detail)
+        self.check_unique(rows, errors)
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return rows
+
+    def check_unique(self, rows, errors):
+        valid = [row for row in rows if row is not None]
+        if not valid:
+            return
+        taken = CustomUser.objects.filter(
+            Q(username__in=[row['username'] for row in valid])
+            | Q(email__in=[row['email'] for row in valid])
+        ).values_list('username', 'email')
+        usernames = set()
+        emails = set()
+        for username, email in taken:
+            usernames.add(username)
+            emails.add(email)
+        for index, row in enumerate(rows):
+            if row is None:
+                continue
+            email = row['email'].lower()
+            row_errors = {}
+            if row['username'] in usernames:
+                row_errors['username'] = [err_username_message]
+            if email in emails:
+                row_errors['email'] = [err_email_message]
+            usernames.add(row['username'])
+            emails.add(email)
+            if row_errors:
+                errors[index] = row_errors
+
+    def create(self, validated_data):
+        # bulk_create вставляет все пачки строк в одной транзакции.
+        try:
+            with transaction.atomic():
+                CustomUser.objects.bulk_create(
+                    [CustomUser(**row) for row in validated_data]
+                )
+        except IntegrityError:
+            # Username или email успел занять другой запрос после
+            # проверки в to_internal_value.
+            errors = [{} for _row in validated_data]
+            self.check_unique(validated_data, errors)
+            if not any(errors):
+                raise
+            raise serializers.ValidationError(errors)
+        return list(CustomUser.objects.filter(
+            username__in=[row['username'] for row in validated_data]
+        ))
+
+
+class BulkUserSerializer(CustomUserSerializer):
+    """Сериализатор строки массового создания пользователей."""
+    username = serializers.CharField(
+        max_length=150, validators=[validate_username_not_me]
+    )
+    email = serializers.EmailField(max_length=254)
+
+    class Meta(CustomUserSerializer.Meta):
+        list_serializer_class = BulkUserListSerializer
+
+
+class BulkUsernamesSerializer(serializers.Serializer):
+    """Список пользователей для массового изменения; ошибки
+    возвращаются по индексам в списке.
+    """
+    usernames = serializers.ListField(
+        child=serializers.CharField(), allow_empty=False,
+        max_length=BULK_LIMIT,
+    )
+
+    def validate(self, data):
+        users = {
+            username: (pk, is_superuser)
+            for pk, username, is_superuser in CustomUser.objects.filter(
+                username__in=data['usernames']
+            ).values_list('pk', 'username', 'is_superuser')
+        }
+        errors = {}
+        for index, username in enumerate(data['usernames']):
+            if username not in users:
+                errors[index] = ['Пользователь не найден']
+                continue
+            error = self.check_user(data, *users[username])
+            if error:
+                errors[index] = [error]
+        if errors:
+            raise serializers.ValidationError({'usernames': errors})
+        data['user_ids'] = [pk for pk, _is_superuser in users.values()]
+        return data
+
+    def check_user(self, data, pk, is_superuser):
+        """Сообщение об ошибке, если пользователя нельзя изменять."""
+
+
+class BulkRoleSerializer(BulkUsernamesSerializer):
+    role = serializers.ChoiceField(choices=CustomUser.ROLES)
+
+    def check_user(self, data, pk, is_superuser):
+        if is_superuser and data['role'] != CustomUser.ADMIN:
+            return 'Роль суперпользователя изменить нельзя'
+
+
+class BulkDeactivateSerializer(BulkUsernamesSerializer):
+
+    def check_user(self, data, pk, is_superuser):
+        if pk == self.context['request'].user.pk:
+            return 'Нельзя деактивировать свою учётную запись'
+
+
 class SignupSerializer(serializers.Serializer):
     """Сериализатор для работы с пользователями."""
     username = serializers.CharField(validators=[validate_username_not_me])
     email = serializers.EmailField()
 
-    def validate(self, data):
-        username_exists = CustomUser.objects.filter(
-            username=data['username']
-        ).exists()
-        email_exists = CustomUser.objects.filter(
-            email=data['email']
-        ).exists()
-        if username_exists and not email_exists:
-            raise serializers.ValidationError(err_username_message)
-        if email_exists and not username_exists:
-            raise serializers.ValidationError(err_email_message)
-        return data
+    def find_user(self, username, email):
+        """Пользователь с этими username и email; ошибка, если одно
+        из значений занято другим пользователем. Один запрос к базе.
+        """
+        matches = CustomUser.objects.filter(
+            Q(username=username) | Q(email=email)
+        )[:2]
+        user = error = None
+        for match in matches:
+            if match.username != username:
+                error = error or err_email_message
+            elif match.email != email.lower():
+                error = err_username_message
+            else:
+                user = match
+        if error:
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [error]}
+            )
+        return user
+
+    def create(self, validated_data):
+        username = validated_data['username']
+        email = validated_data['email']
+        user = self.find_user(username, email)
+        if user is not None:
+            return user
+        # Одновременные регистрации с теми же данными получают
+        # пользователя, созданного первой из них.
+        try:
+            with transaction.atomic():
+                return CustomUser.objects.create(username=username,
+                                                 email=email)
+        except IntegrityError:
+            user = self.find_user(username, email)
+        if user is None:
+            # Конфликтующий пользователь успел удалиться.
+            raise serializers.ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [err_signup_message]}
+            )
+        return user
 
 
 class JWTTokenSerializer(serializers.Serializer):
     """Сериализатор для получения токена."""
     username = serializers.CharField()
     confirmation_code = serializers.CharField()
+
+
+class ProfilingSerializer(serializers.Serializer):
+    """Сериализатор параметров профилирования запросов."""
+    route = serializers.CharField(default='*')
+    rate = serializers.FloatField(min_value=0, max_value=1, default=1)
+    interval = serializers.FloatField(min_value=0.001, max_value=1,
+                                      default=0.005)
+    duration = serializers.IntegerField(min_value=1, max_value=3600,
+                                        default=300)
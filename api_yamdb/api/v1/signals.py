@@ -0,0 +1,62 @@
+from django.db.models.signals import (m2m_changed, post_delete,
+                                      post_migrate, post_save)
+from django.dispatch import receiver
+
+from api.v1.authentication import (forget_all_users, forget_user,
+                                   token_versions)
+from api.v1.cache import response_cache
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.signals import rows_updated
+from users.models import CustomUser
+
+CACHED_MODELS = (Category, Genre, Title, Review, Comment, CustomUser)
+
+
+def bump_generation(sender, **kwargs):
+    """Сбрасывает кэш и валидаторы ответов, зависящих
+    от изменённой модели.
+    """
+    response_cache.bump(sender._meta.label)
+
+
+for model in CACHED_MODELS:
+    post_save.connect(bump_generation, sender=model,
+                      dispatch_uid=f'cache_save_{model._meta.label}')
+    post_delete.connect(bump_generation, sender=model,
+                        dispatch_uid=f'cache_delete_{model._meta.label}')
+
+
+@receiver(m2m_changed, sender=Title.genre.through)
+def title_genre_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        response_cache.bump(Title._meta.label)
+
+
+@receiver(rows_updated)
+def rows_updated_in_bulk(sender, models, **kwargs):
+    for model in models:
+        response_cache.bump(model._meta.label)
+    if CustomUser in models:
+        forget_all_users()
+        token_versions.clear()
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    """Роль, активность и имя пользователя берутся из кэша
+    аутентификации, версия токенов — из памяти процесса; после
+    изменения их нужно перечитать.
+    """
+    forget_user(instance.pk)
+    token_versions.forget(instance.pk)
+
+
+@receiver(post_migrate)
+def database_reset(sender, **kwargs):
+    """После миграций и flush прежние ответы и пользователи
+    недействительны.
+    """
+    response_cache.clear()
+    forget_all_users()
+    token_versions.clear()
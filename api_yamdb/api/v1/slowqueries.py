@@ -0,0 +1,164 @@
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, NotSupportedError, connections
+
+from api.v1.timing import UNRESOLVED, route_label, view_name
+
+logger = logging.getLogger('api.slow_queries')
+
+DEFAULTS = {
+    'THRESHOLD_MS': None,
+    'SAMPLE_RATE': 1.0,
+    'EXPLAIN': True,
+    'FILENAME': None,
+    'MAX_BYTES': 10 * 1024 * 1024,
+    'BACKUP_COUNT': 5,
+}
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def redact(sql):
+    """SQL без значений параметров и литералов."""
+    return LITERAL.sub('?', sql.replace('%s', '?'))
+
+
+def explain(connection, sql, params):
+    """План запроса строками вывода EXPLAIN; для не-SELECT запросов
+    и баз без EXPLAIN — пустой список.
+    """
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return []
+    try:
+        prefix = connection.ops.explain_query_prefix()
+    except NotSupportedError:
+        return []
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except DatabaseError as error:
+        return [f'EXPLAIN не выполнен: {error}']
+    return [str(row[-1]) for row in rows]
+
+
+def full_scan(plan):
+    """Есть ли в плане SQLite полный просмотр таблицы без индекса;
+    просмотр виртуальной таблицы FTS5 идёт по её собственному индексу.
+    """
+    return any(line.startswith('SCAN') and 'USING' not in line
+               and 'VIRTUAL TABLE' not in line for line in plan)
+
+
+def start_file_listener(config):
+    """Подключает к журналу медленных запросов ротируемый файл; запись
+    идёт в фоновом потоке, запрос только кладёт запись в очередь.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+        directory = os.path.dirname(config['FILENAME'])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        handler = RotatingFileHandler(
+            config['FILENAME'], maxBytes=config['MAX_BYTES'],
+            backupCount=config['BACKUP_COUNT'], encoding='utf-8', delay=True,
+        )
+        records = queue.Queue(-1)
+        logger.addHandler(QueueHandler(records))
+        logger.setLevel(logging.WARNING)
+        _listener = QueueListener(records, handler)
+        _listener.start()
+        return _listener
+
+
+def stop_file_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in list(logger.handlers):
+            if isinstance(handler, QueueHandler):
+                logger.removeHandler(handler)
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+class SlowQueryMiddleware:
+    """Журнал запросов к базе дольше THRESHOLD_MS: обработчик, маршрут,
+    SQL без параметров и план EXPLAIN. Без порога не подключается.
+    """
+
+    def __init__(self, get_response):
+        config = {**DEFAULTS, **getattr(settings, 'SLOW_QUERY_LOG', {})}
+        if config['THRESHOLD_MS'] is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = config['THRESHOLD_MS'] / 1000
+        self.sample_rate = config['SAMPLE_RATE']
+        self.explain = config['EXPLAIN']
+        if config['FILENAME']:
+            start_file_listener(config)
+
+    def __call__(self, request):
+        request.slow_query_view = (UNRESOLVED, UNRESOLVED)
+        explaining = False
+
+        def wrapper(execute, sql, params, many, context):
+            nonlocal explaining
+            if explaining:
+                return execute(sql, params, many, context)
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                elapsed = time.perf_counter() - started
+                if (elapsed >= self.threshold
+                        and random.random() < self.sample_rate):
+                    explaining = True
+                    try:
+                        self.log(request, context['connection'], sql,
+                                 params, many, elapsed)
+                    finally:
+                        explaining = False
+
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(wrapper))
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.slow_query_view = (
+            view_name(view_func, request.method.lower()),
+            route_label(request.resolver_match),
+        )
+
+    def log(self, request, connection, sql, params, many, elapsed):
+        view, route = request.slow_query_view
+        plan = []
+        if self.explain and not many:
+            plan = explain(connection, sql, params)
+        logger.warning(json.dumps({
+            'view': view,
+            'route': route,
+            'duration_ms': round(elapsed * 1000, 2),
+            'sql': redact(sql),
+            'plan': plan,
+            'full_scan': full_scan(plan),
+        }, ensure_ascii=False))
@@ -0,0 +1,205 @@
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+DEFAULTS = {
+    'BACKEND': 'local',
+    'CACHE_ALIAS': 'default',
+    'STRIPES': 64,
+    'MAX_KEYS': 100_000,
+}
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@lru_cache(maxsize=None)
+def parse_rate(rate):
+    """'5/min' -> (ёмкость корзины, пополнение в токенах за секунду)."""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / DURATIONS[period[0]]
+
+
+def refill(state, capacity, rate, now):
+    if state is None:
+        return capacity
+    tokens, updated = state
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class LocalBucketStore:
+    """Корзины токенов в памяти процесса.
+
+    Ключи распределены по полосам, у каждой своя блокировка, поэтому
+    потоки с разными ключами почти не ждут друг друга. В полосе хранится
+    не больше MAX_KEYS / STRIPES корзин: при переполнении вытесняется
+    та, к которой дольше всех не обращались.
+    """
+
+    def __init__(self, stripes=64, max_keys=100_000, clock=time.monotonic):
+        self.clock = clock
+        self.limit = max(1, max_keys // stripes)
+        self._stripes = [({}, threading.Lock()) for _ in range(stripes)]
+
+    def take(self, key, capacity, rate):
+        """Берёт токен из корзины; 0, если токен был, иначе
+        сколько секунд ждать следующего.
+        """
+        return self.take_all(((key, capacity, rate),))
+
+    def take_all(self, limits):
+        """Берёт по токену из каждой корзины limits — пар
+        (ключ, ёмкость, пополнение), только если токены есть во всех;
+        возвращает 0 или наибольшее ожидание среди пустых корзин.
+        """
+        stripes = sorted({hash(key) % len(self._stripes)
+                          for key, _capacity, _rate in limits})
+        now = self.clock()
+        # Блокировки полос берутся по возрастанию номера, чтобы два
+        # запроса с общими полосами не ждали друг друга по кругу.
+        for index in stripes:
+            self._stripes[index][1].acquire()
+        try:
+            states = []
+            for key, capacity, rate in limits:
+                buckets, _lock = self._stripes[hash(key) % len(self._stripes)]
+                state = buckets.get(key)
+                if state is None and len(buckets) >= self.limit:
+                    del buckets[next(iter(buckets))]
+                states.append((buckets, key, rate,
+                               refill(state, capacity, rate, now)))
+            wait = max((1 - tokens) / rate
+                       for _buckets, _key, rate, tokens in states)
+            spent = 1 if wait <= 0 else 0
+            for buckets, key, _rate, tokens in states:
+                # Повторная вставка переносит ключ в конец словаря: первым
+                # вытесняется ключ, к которому дольше всех не обращались.
+                buckets.pop(key, None)
+                buckets[key] = (tokens - spent, now)
+        finally:
+            for index in stripes:
+                self._stripes[index][1].release()
+        return max(wait, 0)
+
+    def clear(self):
+        for buckets, lock in self._stripes:
+            with lock:
+                buckets.clear()
+
+
+class CacheBucketStore:
+    """Корзины токенов в кэше Django, общие для всех процессов.
+
+    Чтение и запись корзины не атомарны: при одновременных запросах
+    с одним ключом лимит может быть превышен на число таких запросов.
+    """
+
+    def __init__(self, alias='default', clock=time.time):
+        self.cache = caches[alias]
+        self.clock = clock
+        self.generation = 0
+
+    def take(self, key, capacity, rate):
+        return self.take_all(((key, capacity, rate),))
+
+    def take_all(self, limits):
+        limits = [(f'throttle:{self.generation}:{key}', capacity, rate)
+                  for key, capacity, rate in limits]
+        now = self.clock()
+        stored = self.cache.get_many([key for key, _c, _r in limits])
+        states = [(key, capacity, rate,
+                   refill(stored.get(key), capacity, rate, now))
+                  for key, capacity, rate in limits]
+        wait = max((1 - tokens) / rate for _k, _c, rate, tokens in states)
+        spent = 1 if wait <= 0 else 0
+        for key, capacity, rate, tokens in states:
+            # Запись живёт, пока корзина не наполнится снова.
+            timeout = int((capacity - tokens + 1) / rate) + 1
+            self.cache.set(key, (tokens - spent, now), timeout)
+        return max(wait, 0)
+
+    def clear(self):
+        self.generation += 1
+
+
+_store = None
+_store_config = None
+_store_lock = threading.Lock()
+
+
+def bucket_store():
+    global _store, _store_config
+    config = {**DEFAULTS, **getattr(settings, 'THROTTLE_BUCKETS', {})}
+    if config != _store_config:
+        with _store_lock:
+            if config != _store_config:
+                if config['BACKEND'] == 'cache':
+                    _store = CacheBucketStore(config['CACHE_ALIAS'])
+                else:
+                    _store = LocalBucketStore(config['STRIPES'],
+                                              config['MAX_KEYS'])
+                _store_config = config
+    return _store
+
+
+def reset_throttles():
+    """Наполняет все корзины заново."""
+    bucket_store().clear()
+
+
+class BucketThrottle(BaseThrottle):
+    """Ограничение частоты запросов корзинами токенов по IP-адресу,
+    а также по username и email из тела запроса.
+
+    Лимиты берутся из REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] по ключам
+    ``<scope>_ip`` и ``<scope>_identity``; лимит None отключает проверку.
+    """
+    scope = None
+    identity_fields = ('username', 'email')
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        rates = api_settings.DEFAULT_THROTTLE_RATES
+        limits = []
+        for kind, value in self.identities(request):
+            rate = rates.get(f'{self.scope}_{kind}')
+            if rate is not None:
+                limits.append((f'{self.scope}:{value}', *parse_rate(rate)))
+        if not limits:
+            return True
+        # Отклонённый запрос не тратит токены ни одной из корзин.
+        wait = bucket_store().take_all(limits)
+        if wait:
+            self.retry_after = wait
+            return False
+        return True
+
+    def client_ip(self, request):
+        # Без NUM_PROXIES get_ident берёт адрес из X-Forwarded-For,
+        # который клиент может подставить сам.
+        if api_settings.NUM_PROXIES is None:
+            return request.META.get('REMOTE_ADDR')
+        return self.get_ident(request)
+
+    def identities(self, request):
+        yield 'ip', f'ip:{self.client_ip(request)}'
+        data = request.data if isinstance(request.data, dict) else {}
+        for field in self.identity_fields:
+            value = data.get(field)
+            if isinstance(value, str) and value:
+                yield 'identity', f'{field}:{value.lower()}'
+
+    def wait(self):
+        return self.retry_after
+
+
+class SignupThrottle(BucketThrottle):
+    scope = 'signup'
+
+
+class TokenThrottle(BucketThrottle):
+    scope = 'token'
@@ -0,0 +1,168 @@
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+from api.v1.metrics import request_stats
+
+PHASES = ('db', 'serialize', 'render', 'total')
+UNRESOLVED = 'unresolved'
+API_PREFIX = 'api/v1'
+ROUTE_GROUP = re.compile(r'\(\?P<(\w+)>[^)]*\)')
+FORMAT_SUFFIX = re.compile(r'\\\.\{format\}/\?$')
+
+current_timings = ContextVar('current_timings', default=None)
+
+
+class Timings:
+    """Замеры одного запроса: обработчик, запросы к базе и время
+    этапов в секундах.
+    """
+
+    def __init__(self):
+        self.view = UNRESOLVED
+        self.route = UNRESOLVED
+        self.status = None
+        self.size = None
+        self.queries = 0
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.render_started = None
+        self._active = set()
+
+    def execute_wrapper(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.durations['db'] += time.perf_counter() - started
+
+    def header(self):
+        metrics = [f'view;desc="{self.view}"']
+        for phase in PHASES:
+            metric = f'{phase};dur={self.durations[phase] * 1000:.1f}'
+            if phase == 'db':
+                metric += f';desc="{self.queries} queries"'
+            metrics.append(metric)
+        return ', '.join(metrics)
+
+
+@contextmanager
+def timed(phase):
+    """Прибавляет время блока к этапу текущего запроса без учёта
+    запросов к базе внутри блока; вложенные блоки того же этапа
+    не считаются повторно.
+    """
+    timings = current_timings.get()
+    if timings is None or phase in timings._active:
+        yield
+        return
+    timings._active.add(phase)
+    db_before = timings.durations['db']
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        db_time = timings.durations['db'] - db_before
+        timings.durations[phase] += elapsed - db_time
+        timings._active.discard(phase)
+
+
+def view_name(view_func, method):
+    """Имя обработчика вида ``TitleViewSet.list`` или ``signup``."""
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        if method == 'head':
+            method = 'get'
+        action = actions.get(method, method)
+        return f'{view_func.cls.__name__}.{action}'
+    return getattr(view_func, '__name__', UNRESOLVED)
+
+
+def route_label(resolver_match):
+    """Шаблон маршрута вида ``titles/{title_id}/reviews``: метка
+    с ограниченным числом значений для метрик.
+    """
+    route = ROUTE_GROUP.sub(r'{\1}', resolver_match.route).rstrip('$')
+    route = FORMAT_SUFFIX.sub('', route).rstrip('/')
+    route = route.replace('\\', '')
+    if route.startswith(API_PREFIX):
+        route = route[len(API_PREFIX):].lstrip('/')
+    return route or '/'
+
+
+class TimedSerializerMixin:
+    """Относит время to_representation сериализатора к этапу
+    serialize.
+    """
+
+    def to_representation(self, instance):
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+class ServerTimingMiddleware:
+    """Замеряет запросы к базе, сериализацию, рендеринг и общее время
+    запроса и копит их в request_stats. Заголовок Server-Timing получают
+    все клиенты при SERVER_TIMING_HEADER (по умолчанию DEBUG),
+    иначе только администраторы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = Timings()
+        token = current_timings.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(timings.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_timings.reset(token)
+        timings.durations['total'] = time.perf_counter() - started
+        timings.status = response.status_code
+        if not response.streaming:
+            timings.size = len(response.content)
+        request_stats.observe(timings)
+        if self.show_header(request):
+            response['Server-Timing'] = timings.header()
+        return response
+
+    @staticmethod
+    def show_header(request):
+        if getattr(settings, 'SERVER_TIMING_HEADER', settings.DEBUG):
+            return True
+        # DRF записывает аутентифицированного пользователя и в request.
+        user = getattr(request, 'user', None)
+        return bool(user and user.is_authenticated
+                    and getattr(user, 'is_admin', False))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = current_timings.get()
+        if timings is not None:
+            timings.view = view_name(view_func, request.method.lower())
+            timings.route = route_label(request.resolver_match)
+
+    def process_template_response(self, request, response):
+        timings = current_timings.get()
+        if timings is not None:
+            timings.render_started = time.perf_counter()
+            response.add_post_render_callback(
+                lambda rendered: self.rendered(timings)
+            )
+        return response
+
+    @staticmethod
+    def rendered(timings):
+        timings.durations['render'] += (
+            time.perf_counter() - timings.render_started
+        )
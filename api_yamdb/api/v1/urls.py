@@ -3,7 +3,8 @@ from rest_framework import routers
 
 from api.v1.views import (CategoryViewSet, CommentViewSet, CustomUserViewSet,
                           GenreViewSet, ReviewViewSet, TitleViewSet,
-                          get_auth_token, signup)
+                          export_titles, get_auth_token, metrics, profiling,
+                          profiling_stacks, signup)
 
 v1_router = routers.DefaultRouter()
 v1_router.register(r'titles/(?P<title_id>\d+)/reviews',
@@ -23,5 +24,9 @@ auth_urls = [
 
 urlpatterns = [
     path('', include(v1_router.urls)),
-    path('auth/', include(auth_urls))
+    path('auth/', include(auth_urls)),
+    path('export/titles.ndjson', export_titles, name='export_titles'),
+    path('metrics', metrics, name='metrics'),
+    path('profiling', profiling, name='profiling'),
+    path('profiling/stacks', profiling_stacks, name='profiling_stacks'),
 ]
@@ -1,28 +1,46 @@
-from django.conf import settings
+import csv
+import io
+
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.db.models import Avg
+from django.db.models import F
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, mixins, permissions, status, viewsets
-from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.decorators import (action, api_view, permission_classes,
+                                       throttle_classes)
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import AccessToken
 
-from api.v1.filters import TitleFilter
+from api.v1.authentication import access_token_for, forget_users
+from api.v1.cache import (CachedListMixin, CachedRetrieveMixin,
+                          response_cache)
+from api.v1.conditional import (ConditionalListMixin,
+                                ConditionalRetrieveMixin,
+                                UpdatedAtValidatorMixin)
+from api.v1.export import gzip_stream, title_records
+from api.v1.filters import TitleFilter, TitleSearchFilter
+from api.v1.metrics import CONTENT_TYPE, render_metrics, request_stats
+from api.v1.mixins import SerializerRelatedQuerysetMixin
 from api.v1.permissions import (IsAdmin, IsAdminOrReadOnly,
                                 IsAuthorAdminModeratorOrReadOnly)
-from api.v1.serializers import (CategorySerializer, CommentSerializer,
-                                CustomUserSerializer, GenreSerializer,
-                                JWTTokenSerializer, ReviewSerializer,
+from api.v1.profiling import profiler
+from api.v1.serializers import (BulkDeactivateSerializer, BulkRoleSerializer,
+                                BulkUserSerializer, CategorySerializer,
+                                CommentSerializer, CustomUserSerializer,
+                                GenreSerializer, JWTTokenSerializer,
+                                ProfilingSerializer, ReviewSerializer,
                                 SignupSerializer, TitleListSerializer,
                                 TitleSerializer)
-from reviews.models import Category, Genre, Review, Title
+from api.v1.throttling import SignupThrottle, TokenThrottle
+from outbox.delivery import enqueue
+from reviews.models import Category, Comment, Genre, Review, Title
 from users.models import CustomUser
 
 
-class CreateListDestroyViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+class CreateListDestroyViewSet(SerializerRelatedQuerysetMixin,
+                               mixins.CreateModelMixin, mixins.ListModelMixin,
                                mixins.DestroyModelMixin,
                                viewsets.GenericViewSet):
     """Пользовательский класс вьюсета.
@@ -30,12 +48,15 @@ class CreateListDestroyViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
     """
 
 
-class GetPostPatchDeleteViewSet(viewsets.ModelViewSet):
+class GetPostPatchDeleteViewSet(SerializerRelatedQuerysetMixin,
+                                viewsets.ModelViewSet):
     http_method_names = ('get', 'post', 'patch', 'delete')
 
 
-class CategoryViewSet(CreateListDestroyViewSet):
+class CategoryViewSet(ConditionalListMixin, CachedListMixin,
+                      CreateListDestroyViewSet):
     """Вьюсет для выполнения операций с объектами модели Category."""
+    cache_models = ('reviews.Category',)
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -44,8 +65,10 @@ class CategoryViewSet(CreateListDestroyViewSet):
     lookup_field = 'slug'
 
 
-class GenreViewSet(CreateListDestroyViewSet):
+class GenreViewSet(ConditionalListMixin, CachedListMixin,
+                   CreateListDestroyViewSet):
     """Вьюсет для выполнения операций с объектами модели Genre."""
+    cache_models = ('reviews.Genre',)
     queryset = Genre.objects.all()
     serializer_class = GenreSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -54,13 +77,18 @@ class GenreViewSet(CreateListDestroyViewSet):
     lookup_field = 'slug'
 
 
-class TitleViewSet(GetPostPatchDeleteViewSet):
+class TitleViewSet(ConditionalListMixin, ConditionalRetrieveMixin,
+                   CachedListMixin, CachedRetrieveMixin,
+                   GetPostPatchDeleteViewSet):
     """Вьюсет для выполнения операций с объектами модели Title."""
-    queryset = Title.objects.all().annotate(
-        rating=Avg('reviews__score')
-    ).order_by('-year')
+    cache_models = ('reviews.Title', 'reviews.Category', 'reviews.Genre',
+                    'reviews.Review')
+    queryset = Title.objects.all().order_by('-year')
+    cursor_ordering = ('-year', 'id')
+    # Поиск сортирует по релевантности, которой нет в ключе курсора.
+    cursor_incompatible_params = (TitleSearchFilter.search_param,)
     permission_classes = (IsAdminOrReadOnly, )
-    filter_backends = (DjangoFilterBackend, )
+    filter_backends = (DjangoFilterBackend, TitleSearchFilter)
     filterset_class = TitleFilter
 
     def get_serializer_class(self):
@@ -69,26 +97,36 @@ class TitleViewSet(GetPostPatchDeleteViewSet):
         return TitleSerializer
 
 
-class ReviewViewSet(GetPostPatchDeleteViewSet):
+class ReviewViewSet(UpdatedAtValidatorMixin, ConditionalListMixin,
+                    ConditionalRetrieveMixin, GetPostPatchDeleteViewSet):
     """Вьюсет для выполнения операций с объектами модели Review."""
+    validator_models = ('reviews.Review', 'users.CustomUser')
     serializer_class = ReviewSerializer
     permission_classes = (IsAuthorAdminModeratorOrReadOnly,)
+    cursor_ordering = ('-pub_date', 'id')
 
     def get_queryset(self):
         title_id = self.kwargs.get('title_id')
         title = get_object_or_404(Title, pk=title_id)
         return title.reviews.all()
 
+    def get_validator_queryset(self):
+        return Review.objects.filter(title=self.kwargs.get('title_id'))
+
     def perform_create(self, serializer):
-        title_id = self.kwargs.get('title_id')
+        # Существование произведения проверяет внешний ключ: ошибку
+        # вставки ReviewSerializer.create превращает в ответ 404.
         serializer.save(author=self.request.user,
-                        title=get_object_or_404(Title, pk=title_id))
+                        title_id=self.kwargs.get('title_id'))
 
 
-class CommentViewSet(GetPostPatchDeleteViewSet):
+class CommentViewSet(UpdatedAtValidatorMixin, ConditionalListMixin,
+                     ConditionalRetrieveMixin, GetPostPatchDeleteViewSet):
     """Вьюсет для выполнения операций с объектами модели Comment."""
+    validator_models = ('reviews.Comment', 'users.CustomUser')
     serializer_class = CommentSerializer
     permission_classes = (IsAuthorAdminModeratorOrReadOnly,)
+    cursor_ordering = ('-pub_date', 'id')
 
     def get_queryset(self):
         title_id = self.kwargs.get('title_id')
@@ -96,6 +134,12 @@ class CommentViewSet(GetPostPatchDeleteViewSet):
         review = get_object_or_404(Review, title=title_id, pk=review_id)
         return review.comments.all()
 
+    def get_validator_queryset(self):
+        return Comment.objects.filter(
+            review=self.kwargs.get('review_id'),
+            review__title=self.kwargs.get('title_id'),
+        )
+
     def perform_create(self, serializer):
         title_id = self.kwargs.get('title_id')
         review_id = self.kwargs.get('review_id')
@@ -104,12 +148,14 @@ class CommentViewSet(GetPostPatchDeleteViewSet):
                                                  title=title_id))
 
 
-class CustomUserViewSet(viewsets.ModelViewSet):
+class CustomUserViewSet(SerializerRelatedQuerysetMixin,
+                        viewsets.ModelViewSet):
     """Вьюсет для выполнения операций с объектами модели CustomUser."""
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
     lookup_field = 'username'
     permission_classes = (IsAdmin,)
+    cursor_ordering = ('id',)
 
     @action(
         methods=['get', 'patch'],
@@ -119,7 +165,8 @@ class CustomUserViewSet(viewsets.ModelViewSet):
     )
     def users_own_profile(self, request):
         """Метод для работы пользователя с профилем."""
-        current_user = request.user
+        # request.user из кэша аутентификации содержит не все поля.
+        current_user = CustomUser.objects.get(pk=request.user.pk)
         if request.method == 'GET':
             serializer = self.get_serializer(current_user)
             return Response(serializer.data, status=status.HTTP_200_OK)
@@ -133,35 +180,92 @@ class CustomUserViewSet(viewsets.ModelViewSet):
             serializer.save(role=current_user.role)
             return Response(serializer.data, status=status.HTTP_200_OK)
 
+    @action(methods=['post'], detail=False, url_path='bulk/create')
+    def bulk_create_users(self, request):
+        """Создание пользователей из JSON-массива или csv-файла file."""
+        data = request.data
+        if 'file' in request.FILES:
+            data = read_csv_users(request.FILES['file'])
+        serializer = BulkUserSerializer(
+            data=data, many=True, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        users = serializer.save()
+        users_changed([user.pk for user in users])
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(methods=['post'], detail=False, url_path='bulk/role')
+    def bulk_role(self, request):
+        """Смена роли пользователей из списка usernames."""
+        return self.update_users(BulkRoleSerializer, 'role')
+
+    @action(methods=['post'], detail=False, url_path='bulk/deactivate')
+    def bulk_deactivate(self, request):
+        """Деактивация пользователей из списка usernames."""
+        return self.update_users(BulkDeactivateSerializer, is_active=False)
+
+    def update_users(self, serializer_class, *fields, **changes):
+        serializer = serializer_class(
+            data=self.request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        user_ids = serializer.validated_data['user_ids']
+        for field in fields:
+            changes[field] = serializer.validated_data[field]
+        # Один UPDATE без сигналов: у изменённых пользователей растёт
+        # версия токенов, кэши сбрасываются вручную.
+        updated = CustomUser.objects.filter(pk__in=user_ids).exclude(
+            **changes
+        ).update(token_version=F('token_version') + 1, **changes)
+        users_changed(user_ids)
+        return Response({'updated': updated}, status=status.HTTP_200_OK)
+
+
+def read_csv_users(file):
+    """Строки csv-файла с заголовком username,email,...; пустые
+    значения не передаются.
+    """
+    try:
+        lines = io.TextIOWrapper(file, encoding='utf-8-sig')
+        return [
+            {key: value for key, value in row.items() if key and value}
+            for row in csv.DictReader(lines)
+        ]
+    except (UnicodeDecodeError, csv.Error) as error:
+        raise ValidationError({'file': [f'Некорректный csv-файл: {error}']})
+
+
+def users_changed(user_ids):
+    response_cache.bump(CustomUser._meta.label)
+    forget_users(user_ids)
+
 
 def send_confirmation_code(user):
     """Функция отправки кода подтверждения."""
     confirmation_code = default_token_generator.make_token(user)
-    send_mail(
+    enqueue(
         subject='Код подтверждения',
-        message=f'Ваш код подтверждения, {confirmation_code}',
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[user.email]
+        body=f'Ваш код подтверждения, {confirmation_code}',
+        to=user.email,
     )
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([SignupThrottle])
 def signup(request):
     """view-функция получения пользователем токена для API."""
     serializer = SignupSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
-    username = serializer.data['username']
-    email = serializer.data['email']
-    user, _ = CustomUser.objects.get_or_create(
-        username=username, email=email
-    )
+    user = serializer.save()
     send_confirmation_code(user)
-    return Response(serializer.data, status=status.HTTP_200_OK)
+    request_stats.increment('signups')
+    return Response(serializer.validated_data, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([TokenThrottle])
 def get_auth_token(request):
     """Функция генерации и отправки токена."""
     serializer = JWTTokenSerializer(data=request.data)
@@ -176,5 +280,54 @@ def get_auth_token(request):
     ):
         err = f'Пароль не совпадает с отправленным на email {confirm_code}'
         return Response(err, status=status.HTTP_400_BAD_REQUEST)
-    token = AccessToken.for_user(user)
+    token = access_token_for(user)
+    request_stats.increment('tokens_issued')
     return Response({'token': str(token)}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def export_titles(request):
+    """Потоковая выгрузка всех произведений в формате NDJSON."""
+    records = title_records()
+    accept_encoding = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    compress = 'gzip' in accept_encoding or 'gzip' in request.query_params
+    if compress:
+        records = gzip_stream(records)
+    response = StreamingHttpResponse(
+        records, content_type='application/x-ndjson; charset=utf-8'
+    )
+    if compress:
+        response['Content-Encoding'] = 'gzip'
+    response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def metrics(request):
+    """Метрики запросов в текстовом формате Prometheus."""
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
+
+
+@api_view(['GET', 'POST', 'DELETE'])
+@permission_classes([IsAdmin])
+def profiling(request):
+    """Состояние, включение и выключение профилирования запросов."""
+    if request.method == 'POST':
+        serializer = ProfilingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        profiler.start(**serializer.validated_data)
+    elif request.method == 'DELETE':
+        profiler.stop()
+    return Response(profiler.status(), status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdmin])
+def profiling_stacks(request):
+    """Стеки профилировщика в формате collapsed для flame graph."""
+    response = HttpResponse(profiler.collapsed(),
+                            content_type='text/plain; charset=utf-8')
+    response['Content-Disposition'] = 'attachment; filename="stacks.txt"'
+    return response
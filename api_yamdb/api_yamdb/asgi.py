@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
 application = get_asgi_application()
+
+# Письма из очереди отправляет фоновый поток процесса сервера.
+from outbox.delivery import autostart  # noqa: E402
+
+autostart()
@@ -21,11 +21,15 @@ INSTALLED_APPS = [
     'users',
     'api',
     'filldb',
+    'outbox',
     'rest_framework',
     'django_filters'
 ]
 
 MIDDLEWARE = [
+    'api.v1.timing.ServerTimingMiddleware',
+    'api.v1.profiling.ProfilingMiddleware',
+    'api.v1.slowqueries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -101,11 +105,67 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.v1.authentication.CachedJWTAuthentication',
     ],
 
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.v1.pagination.OptionalCursorPagination',
     'PAGE_SIZE': 5,
+    # Лимиты регистрации и выдачи токена: с одного IP-адреса
+    # и для одного username или email (см. api.v1.throttling).
+    'DEFAULT_THROTTLE_RATES': {
+        'signup_ip': '30/min',
+        'signup_identity': '5/min',
+        'token_ip': '30/min',
+        'token_identity': '10/min',
+    },
+}
+
+# Хранилище корзин ограничения частоты: local — в памяти процесса,
+# cache — в кэше CACHE_ALIAS, общем для процессов.
+THROTTLE_BUCKETS = {
+    'BACKEND': 'local',
+    'CACHE_ALIAS': 'default',
+    'STRIPES': 64,
+    'MAX_KEYS': 100_000,
+}
+
+# Кэш пользователей для JWT-аутентификации: время жизни записи в секундах.
+AUTH_USER_CACHE = {
+    'ALIAS': 'default',
+    'TIMEOUT': 60,
+}
+
+# Авторизация по роли из JWT без обращения к базе: в токен
+# записываются роль и версия токенов пользователя, версия сверяется
+# с копией в памяти процесса, которая перечитывается раз в VERSION_TTL
+# секунд. Токены без этих утверждений проверяются как обычно.
+TOKEN_CLAIMS_AUTH = {
+    'ENABLED': False,
+    'VERSION_TTL': 60,
+    'MAX_USERS': 100_000,
+}
+
+# Кэш ответов: тела ответов в памяти процесса не дольше timeout секунд,
+# поколения моделей — в кэше Django alias (общем для процессов, если
+# CACHES настроен на memcached или redis).
+RESPONSE_CACHE = {
+    'BACKEND': 'api.v1.cache.LRUCacheBackend',
+    'OPTIONS': {'max_entries': 1024, 'timeout': 60, 'alias': 'default'},
+}
+
+# Отдавать ли замеры запроса всем клиентам в заголовке Server-Timing;
+# администраторы получают его всегда.
+SERVER_TIMING_HEADER = DEBUG
+
+# Журнал запросов к базе дольше THRESHOLD_MS (None — выключен)
+# с планом EXPLAIN; SAMPLE_RATE — доля записываемых медленных запросов.
+SLOW_QUERY_LOG = {
+    'THRESHOLD_MS': 100,
+    'SAMPLE_RATE': 1.0,
+    'EXPLAIN': True,
+    'FILENAME': os.path.join(BASE_DIR, 'logs', 'slow_queries.log'),
+    'MAX_BYTES': 10 * 1024 * 1024,
+    'BACKUP_COUNT': 5,
 }
 
 SIMPLE_JWT = {
@@ -117,5 +177,20 @@ DEFAULT_FROM_EMAIL = 'webmaster@localhost'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Очередь исходящих писем. WORKER: inline — отправка в том же запросе,
+# thread — фоновым потоком процесса, command — только командой
+# sendoutbox; по умолчанию thread, и только с locmem-бэкендом тестов
+# inline. Неудачная попытка повторяется через BACKOFF секунд,
+# каждый следующий раз вдвое позже, но не реже чем раз в MAX_BACKOFF.
+EMAIL_OUTBOX = {
+    'WORKER': None,
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF': 30,
+    'MAX_BACKOFF': 3600,
+    'LEASE': 300,
+    'POLL_INTERVAL': 5,
+}
+
 TIME_ZONE = 'UTC'
 USE_TZ = True
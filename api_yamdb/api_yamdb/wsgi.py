@@ -5,3 +5,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'api_yamdb.settings')
 
 application = get_wsgi_application()
+
+# Письма из очереди отправляет фоновый поток процесса сервера.
+from outbox.delivery import autostart  # noqa: E402
+
+autostart()
@@ -0,0 +1,108 @@
+import csv
+import gzip
+import logging
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from filldb.management.commands.filldatabase import TitleGenre
+from reviews.models import Category, Comment, Genre, Review, Title
+from users.models import CustomUser
+
+DEFAULT_CHUNK_SIZE = 2000
+
+
+def format_date(value):
+    """Дата в формате csv файлов filldatabase; миллисекунды, как
+    в исходных файлах, если микросекунды не нужны.
+    """
+    if value.microsecond % 1000:
+        return value.strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+    return value.strftime('%Y-%m-%dT%H:%M:%S.') + (
+        f'{value.microsecond // 1000:03d}Z'
+    )
+
+
+# Файл, модель, столбцы csv и поля модели в том же порядке.
+EXPORTS = (
+    ('users.csv', CustomUser,
+     ('id', 'username', 'email', 'role', 'bio', 'first_name', 'last_name'),
+     ('id', 'username', 'email', 'role', 'bio', 'first_name',
+      'last_name')),
+    ('category.csv', Category, ('id', 'name', 'slug'),
+     ('id', 'name', 'slug')),
+    ('genre.csv', Genre, ('id', 'name', 'slug'), ('id', 'name', 'slug')),
+    ('titles.csv', Title, ('id', 'name', 'year', 'category'),
+     ('id', 'name', 'year', 'category_id')),
+    ('genre_title.csv', TitleGenre, ('id', 'title_id', 'genre_id'),
+     ('id', 'title_id', 'genre_id')),
+    ('review.csv', Review,
+     ('id', 'title_id', 'text', 'author', 'score', 'pub_date'),
+     ('id', 'title_id', 'text', 'author_id', 'score', 'pub_date')),
+    ('comments.csv', Comment,
+     ('id', 'review_id', 'text', 'author', 'pub_date'),
+     ('id', 'review_id', 'text', 'author_id', 'pub_date')),
+)
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'strftime'):
+        return format_date(value)
+    return value
+
+
+def export_table(path, model, header, fields, chunk_size, compress):
+    """Построчно записывает таблицу в csv, не загружая её в память,
+    возвращает число строк.
+    """
+    opener = gzip.open if compress else open
+    rows = model.objects.order_by('pk').values_list(*fields).iterator(
+        chunk_size=chunk_size
+    )
+    count = 0
+    with opener(path, 'wt', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            writer.writerow([format_value(value) for value in row])
+            count += 1
+    return count
+
+
+class Command(BaseCommand):
+    help = 'выгрузка базы данных в csv файлы в формате filldatabase'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output_dir',
+            help='каталог для csv файлов',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help='число строк, читаемых из базы за один раз',
+        )
+        parser.add_argument(
+            '--gzip',
+            action='store_true',
+            help='сжимать файлы (имена с суффиксом .gz)',
+        )
+
+    def handle(self, *args, **options):
+        output_dir = options['output_dir']
+        os.makedirs(output_dir, exist_ok=True)
+        for filename, model, header, fields in EXPORTS:
+            if options['gzip']:
+                filename += '.gz'
+            started = time.perf_counter()
+            count = export_table(
+                os.path.join(output_dir, filename), model, header, fields,
+                options['chunk_size'], options['gzip'],
+            )
+            elapsed = time.perf_counter() - started
+            logging.info(f'{filename}: {count} строк за {elapsed:.2f} с')
+        logging.info('выгрузка завершена')
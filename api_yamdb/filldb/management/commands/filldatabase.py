@@ -1,16 +1,32 @@
 import csv
 import datetime
+import hashlib
 import logging
 import os
 import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
 
+import django
 from django.conf import settings
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import IntegrityError, connection, transaction
 
+from filldb.models import ImportedRow
 from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.rating import rebuild_title_ratings
+from reviews.signals import rows_updated
 from users.models import CustomUser
 
 CSV_DIR = os.path.join(settings.BASE_DIR, 'static', 'data')
+DEFAULT_BATCH_SIZE = 1000
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+TitleGenre = Title.genre.through
+# Модели, которые команда меняет в обход сигналов post_save.
+CHANGED_MODELS = (CustomUser, Category, Genre, Title, Review, Comment)
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,65 +36,432 @@ logging.basicConfig(
 
 
 def read_file(filename):
+    """Построчно читает csv файл, пропуская заголовок."""
     filepath = os.path.join(CSV_DIR, filename)
-    with open(filepath, 'r', encoding='utf-8') as f:
-        reader = list(csv.reader(f))
-    reader.pop(0)
-    return reader
-
-
-def create_object(DBclass, row):
-    if DBclass == CustomUser:
-        kwargs = {'pk': int(row[0]), 'username': row[1], 'email': row[2],
-                  'role': row[3]}
-    elif DBclass == Category:
-        kwargs = {'pk': int(row[0]), 'name': row[1], 'slug': row[2]}
-    elif DBclass == Genre:
-        kwargs = {'pk': int(row[0]), 'name': row[1], 'slug': row[2]}
-    elif DBclass == Title:
-        kwargs = {'pk': int(row[0]), 'name': row[1], 'year': row[2],
-                  'category': Category.objects.get(pk=int(row[3]))}
-    elif DBclass == Review:
-        kwargs = {'pk': int(row[0]),
-                  'title': Title.objects.get(pk=int(row[1])),
-                  'text': row[2],
-                  'author': (CustomUser.objects.get(pk=int(row[3]))),
-                  'score': int(row[4]),
-                  'pub_date': (datetime.datetime.
-                               strptime(row[5], '%Y-%m-%dT%H:%M:%S.%fZ'))}
-    elif DBclass == Comment:
-        kwargs = {'pk': int(row[0]),
-                  'review': Review.objects.get(pk=int(row[1])),
-                  'text': row[2],
-                  'author': (CustomUser.objects.get(pk=int(row[3]))),
-                  'pub_date': (datetime.datetime.
-                               strptime(row[4], '%Y-%m-%dT%H:%M:%S.%fZ'))}
-    DBclass.objects.create(**kwargs)
-
-
-def addGenre(filename):
-    reader = read_file(filename)
-    for row in reader:
-        title = Title.objects.get(pk=int(row[1]))
-        genre = Genre.objects.get(pk=int(row[2]))
-        genre.title_genre.add(title)
-
-
-def read_to_DB(filename, DBclass):
-    reader = read_file(filename)
-    for row in reader:
-        create_object(DBclass, row)
+    with open(filepath, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        yield from reader
+
+
+def parse_date(value):
+    return datetime.datetime.strptime(value, DATE_FORMAT).replace(
+        tzinfo=datetime.timezone.utc
+    )
+
+
+class Table:
+    """Описание загружаемой csv таблицы.
+
+    parse превращает строку csv в значения полей модели, foreign_keys
+    сопоставляет полям-ссылкам модели, на которые они ссылаются; по ним же
+    строится граф зависимостей между таблицами.
+    """
+
+    def __init__(self, filename, model, parse, foreign_keys=None):
+        self.filename = filename
+        self.model = model
+        self.parse = parse
+        self.foreign_keys = foreign_keys or {}
+
+    @property
+    def referenced_models(self):
+        return set(self.foreign_keys.values())
+
+
+def parse_user(row):
+    return {'pk': int(row[0]), 'username': row[1], 'email': row[2],
+            'role': row[3], 'bio': row[4] or None,
+            'first_name': row[5] or None, 'last_name': row[6] or None}
+
+
+def parse_category(row):
+    return {'pk': int(row[0]), 'name': row[1], 'slug': row[2]}
+
+
+def parse_genre(row):
+    return {'pk': int(row[0]), 'name': row[1], 'slug': row[2]}
+
+
+def parse_title(row):
+    return {'pk': int(row[0]), 'name': row[1], 'year': int(row[2]),
+            'category_id': int(row[3]) if row[3] else None}
+
+
+def parse_title_genre(row):
+    return {'pk': int(row[0]), 'title_id': int(row[1]),
+            'genre_id': int(row[2])}
+
+
+def parse_review(row):
+    return {'pk': int(row[0]), 'title_id': int(row[1]), 'text': row[2],
+            'author_id': int(row[3]), 'score': int(row[4]),
+            'pub_date': parse_date(row[5])}
+
+
+def parse_comment(row):
+    return {'pk': int(row[0]), 'review_id': int(row[1]), 'text': row[2],
+            'author_id': int(row[3]), 'pub_date': parse_date(row[4])}
+
+
+TABLES = (
+    Table('users.csv', CustomUser, parse_user),
+    Table('category.csv', Category, parse_category),
+    Table('genre.csv', Genre, parse_genre),
+    Table('titles.csv', Title, parse_title, {'category_id': Category}),
+    Table('genre_title.csv', TitleGenre, parse_title_genre,
+          {'title_id': Title, 'genre_id': Genre}),
+    Table('review.csv', Review, parse_review,
+          {'title_id': Title, 'author_id': CustomUser}),
+    Table('comments.csv', Comment, parse_comment,
+          {'review_id': Review, 'author_id': CustomUser}),
+)
+
+
+def check_foreign_keys(table, values, known_ids):
+    """Проверяет ссылки строки по множествам уже загруженных id."""
+    for field, model in table.foreign_keys.items():
+        value = values[field]
+        if value is not None and value not in known_ids[model]:
+            raise CommandError(
+                f'{table.filename}: объект {model.__name__} '
+                f'с id={value} не найден'
+            )
+    return values
+
+
+def reset_sequences(model):
+    """После вставки с явными id сдвигает счётчики первичных ключей
+    (для баз данных с последовательностями).
+    """
+    sql_list = connection.ops.sequence_reset_sql(no_style(), [model])
+    if sql_list:
+        with connection.cursor() as cursor:
+            for sql in sql_list:
+                cursor.execute(sql)
+
+
+def insert_rows(model, rows, batch_size):
+    """Вставляет строки пачками bulk_create в одной транзакции,
+    возвращает множество id вставленных объектов.
+    """
+    objects = (model(**values) for values in rows)
+    loaded_ids = set()
+    with transaction.atomic():
+        for batch in batched(objects, batch_size):
+            model.objects.bulk_create(batch)
+            loaded_ids.update(obj.pk for obj in batch)
+        reset_sequences(model)
+    return loaded_ids
+
+
+def read_to_DB(table, known_ids, batch_size):
+    """Потоково читает, проверяет и загружает таблицу,
+    возвращает число загруженных строк.
+    """
+    rows = (check_foreign_keys(table, table.parse(row), known_ids)
+            for row in read_file(table.filename))
+    loaded_ids = insert_rows(table.model, rows, batch_size)
+    known_ids[table.model] |= loaded_ids
+    return len(loaded_ids)
+
+
+def parse_table(index, known_ids):
+    """Читает и проверяет таблицу в процессе пула,
+    возвращает строки и время разбора.
+    """
+    table = TABLES[index]
+    started = time.perf_counter()
+    rows = [check_foreign_keys(table, table.parse(row), known_ids)
+            for row in read_file(table.filename)]
+    return rows, time.perf_counter() - started
+
+
+def table_dependencies():
+    """Граф зависимостей: индекс таблицы -> индексы таблиц,
+    на модели которых она ссылается.
+    """
+    loaded_by = {table.model: index for index, table in enumerate(TABLES)}
+    return {
+        index: {loaded_by[model] for model in table.referenced_models}
+        for index, table in enumerate(TABLES)
+    }
+
+
+def load_parallel(workers, known_ids, batch_size):
+    """Разбирает независимые таблицы параллельно в пуле процессов.
+
+    Таблица отправляется в пул, как только разобраны таблицы, на которые
+    она ссылается, и известны их id. Вставка выполняется в основном
+    процессе последовательно в порядке TABLES: SQLite допускает только
+    одного пишущего, а ссылки должны вставляться после их целей.
+    Возвращает время этапов по таблицам.
+    """
+    dependencies = table_dependencies()
+    # pending — разбираемые таблицы, parsed — разобранные строки ещё
+    # не вставленных таблиц, inserted — вставленные таблицы.
+    pending, parsed, inserted, timings = {}, {}, set(), {}
+    submitted = set()
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=django.setup) as pool:
+        for index, table in enumerate(TABLES):
+            while True:
+                ready_ids = parsed.keys() | inserted
+                for ready, deps in dependencies.items():
+                    if ready not in submitted and deps <= ready_ids:
+                        fk_ids = {
+                            model: known_ids[model]
+                            for model in TABLES[ready].referenced_models
+                        }
+                        future = pool.submit(parse_table, ready, fk_ids)
+                        pending[future] = ready
+                        submitted.add(ready)
+                if index in parsed:
+                    break
+                started = time.perf_counter()
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                timings.setdefault(index, {}).setdefault('wait', 0)
+                timings[index]['wait'] += time.perf_counter() - started
+                for future in done:
+                    key = pending.pop(future)
+                    rows, elapsed = future.result()
+                    parsed[key] = rows
+                    known_ids[TABLES[key].model] |= {
+                        values['pk'] for values in rows
+                    }
+                    timings.setdefault(key, {})['parse'] = elapsed
+            started = time.perf_counter()
+            try:
+                insert_rows(table.model, parsed.pop(index), batch_size)
+            except IntegrityError as error:
+                raise CommandError(f'{table.filename}: {error}')
+            inserted.add(index)
+            timings[index]['insert'] = time.perf_counter() - started
+    return timings
+
+
+def row_hash(row):
+    return hashlib.md5('\x1f'.join(row).encode('utf-8')).hexdigest()
+
+
+class TableDiff:
+    """Изменения таблицы относительно манифеста предыдущей синхронизации."""
+
+    def __init__(self, table):
+        self.table = table
+        self.created = []
+        self.updated = []
+        self.deleted = set()
+        self.pruned = set()
+        self.hashes = {}
+
+    @property
+    def changed(self):
+        return self.created + self.updated
+
+    def __str__(self):
+        return (f'{self.table.filename}: добавлено {len(self.created)}, '
+                f'изменено {len(self.updated)}, удалено {len(self.deleted)}, '
+                f'устаревших записей манифеста {len(self.pruned)}')
+
+
+def diff_table(table, existing_ids):
+    """Сравнивает хэши строк csv с манифестом. Разбираются только
+    изменившиеся строки; строка без записи в манифесте, уже
+    существующая в базе, считается изменённой, а удалённая из базы —
+    новой. Записи манифеста о строках, которых нет ни в csv, ни
+    в базе, удаляются.
+    """
+    manifest = dict(ImportedRow.objects.filter(
+        table=table.filename
+    ).values_list('row_id', 'row_hash').iterator())
+    diff = TableDiff(table)
+    for row in read_file(table.filename):
+        pk = int(row[0])
+        digest = row_hash(row)
+        if manifest.pop(pk, None) == digest and pk in existing_ids:
+            continue
+        diff.hashes[pk] = digest
+        values = table.parse(row)
+        if pk in existing_ids:
+            diff.updated.append(values)
+        else:
+            diff.created.append(values)
+    diff.deleted = set(manifest) & existing_ids
+    diff.pruned = set(manifest) - existing_ids
+    return diff
+
+
+def batched(iterable, batch_size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def apply_diff(diff, known_ids, batch_size):
+    """Добавляет и изменяет строки таблицы пачками и обновляет манифест."""
+    table = diff.table
+    for values in diff.changed:
+        check_foreign_keys(table, values, known_ids)
+    insert_rows(table.model, diff.created, batch_size)
+    known_ids[table.model] |= {values['pk'] for values in diff.created}
+    if diff.updated:
+        fields = [field for field in diff.updated[0] if field != 'pk']
+        # bulk_update не вызывает pre_save: даты auto_now (по ним
+        # считаются валидаторы ответов) проставляются явно.
+        auto_now = [field for field in table.model._meta.concrete_fields
+                    if getattr(field, 'auto_now', False)]
+        fields += [field.name for field in auto_now]
+        for batch in batched(diff.updated, batch_size):
+            objects = [table.model(**values) for values in batch]
+            for obj in objects:
+                for field in auto_now:
+                    field.pre_save(obj, add=False)
+            table.model.objects.bulk_update(objects, fields)
+    stale = set(diff.hashes) | diff.deleted | diff.pruned
+    for batch in batched(stale, batch_size):
+        ImportedRow.objects.filter(
+            table=table.filename, row_id__in=batch
+        ).delete()
+    for batch in batched(diff.hashes.items(), batch_size):
+        ImportedRow.objects.bulk_create(
+            ImportedRow(table=table.filename, row_id=pk, row_hash=digest)
+            for pk, digest in batch
+        )
+
+
+def affected_titles(diffs, batch_size):
+    """id произведений, чьи отзывы добавлены или изменены в обход
+    сигналов: и новые, и прежние произведения изменённых отзывов.
+    Вызывается до применения изменений; удаление отзывов
+    пересчитывает рейтинг само.
+    """
+    titles = set()
+    for diff in diffs:
+        if diff.table.model is not Review:
+            continue
+        titles |= {values['title_id'] for values in diff.changed}
+        updated = [values['pk'] for values in diff.updated]
+        for batch in batched(updated, batch_size):
+            titles.update(Review.objects.filter(
+                pk__in=batch
+            ).values_list('title_id', flat=True))
+    return titles
+
+
+def upsert(known_ids, batch_size):
+    """Синхронизирует базу с csv файлами, изменяя только строки,
+    хэш которых отличается от манифеста. Удаление выполняется
+    в обратном порядке зависимостей, вставка — в прямом.
+    """
+    with transaction.atomic():
+        diffs = [diff_table(table, known_ids[table.model])
+                 for table in TABLES]
+        titles = affected_titles(diffs, batch_size)
+        for diff in reversed(diffs):
+            for batch in batched(diff.deleted, batch_size):
+                diff.table.model.objects.filter(pk__in=batch).delete()
+            known_ids[diff.table.model] -= diff.deleted
+        for diff in diffs:
+            apply_diff(diff, known_ids, batch_size)
+        rebuild_title_ratings(Title.objects.filter(pk__in=titles))
+    return diffs
 
 
 class Command(BaseCommand):
     help = 'заполнение базы данных из csv файлов'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='число строк в одной пачке bulk_create',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help=('число процессов для разбора независимых таблиц; '
+                  'при значении больше 1 таблица целиком держится в памяти '
+                  'до вставки'),
+        )
+        parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help=('синхронизировать заполненную базу: изменить только '
+                  'строки, отличающиеся от предыдущей синхронизации'),
+        )
+
     def handle(self, *args, **options):
-        read_to_DB('users.csv', CustomUser)
-        read_to_DB('category.csv', Category)
-        read_to_DB('genre.csv', Genre)
-        read_to_DB('titles.csv', Title)
-        addGenre('genre_title.csv')
-        read_to_DB('review.csv', Review)
-        read_to_DB('comments.csv', Comment)
-        logging.info('база данных готова')
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size должен быть положительным')
+        known_ids = {
+            model: set(model.objects.values_list('pk', flat=True))
+            for model in (CustomUser, Category, Genre, Title, Review)
+        }
+        known_ids[TitleGenre] = set(
+            TitleGenre.objects.values_list('pk', flat=True)
+        )
+        known_ids[Comment] = set(
+            Comment.objects.values_list('pk', flat=True)
+        )
+        if options['upsert']:
+            self.upsert(known_ids, batch_size)
+        else:
+            if options['workers'] > 1:
+                self.load_parallel(options['workers'], known_ids,
+                                   batch_size)
+            else:
+                self.load_sequential(known_ids, batch_size)
+            # bulk_create не вызывает сигналы, поэтому рейтинги
+            # произведений пересчитываются целиком.
+            rebuild_title_ratings()
+            logging.info('база данных готова')
+        rows_updated.send(sender=self.__class__, models=CHANGED_MODELS)
+
+    def load_sequential(self, known_ids, batch_size):
+        for table in TABLES:
+            started = time.perf_counter()
+            try:
+                count = read_to_DB(table, known_ids, batch_size)
+            except IntegrityError as error:
+                raise CommandError(f'{table.filename}: {error}')
+            elapsed = time.perf_counter() - started
+            logging.info(
+                f'{table.filename}: {count} строк за {elapsed:.2f} с '
+                f'({count / elapsed if elapsed else 0:.0f} строк/с)'
+            )
+
+    def upsert(self, known_ids, batch_size):
+        started = time.perf_counter()
+        try:
+            diffs = upsert(known_ids, batch_size)
+        except IntegrityError as error:
+            raise CommandError(str(error))
+        for diff in diffs:
+            logging.info(str(diff))
+        logging.info(
+            f'синхронизация завершена за {time.perf_counter() - started:.2f} с'
+        )
+
+    def load_parallel(self, workers, known_ids, batch_size):
+        started = time.perf_counter()
+        timings = load_parallel(workers, known_ids, batch_size)
+        wall = time.perf_counter() - started
+        for index, table in enumerate(TABLES):
+            stages = timings[index]
+            logging.info(
+                f'{table.filename}: разбор {stages["parse"]:.2f} с, '
+                f'ожидание {stages.get("wait", 0):.2f} с, '
+                f'вставка {stages["insert"]:.2f} с'
+            )
+        parse_total = sum(stages['parse'] for stages in timings.values())
+        logging.info(
+            f'всего {wall:.2f} с, суммарный разбор {parse_total:.2f} с '
+            f'в {workers} процессах'
+        )
@@ -0,0 +1,236 @@
+import datetime
+import logging
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from filldb.management.commands.filldatabase import (CHANGED_MODELS,
+                                                     TitleGenre,
+                                                     reset_sequences)
+from reviews.models import Category, Comment, Genre, Review, Title
+from reviews.rating import rebuild_title_ratings
+from reviews.signals import rows_updated
+from users.models import CustomUser
+
+# Размер набора: число отзывов, произведений и пользователей.
+SIZES = {
+    '10k': (10_000, 500, 2_000),
+    '1m': (1_000_000, 20_000, 100_000),
+    '10m': (10_000_000, 200_000, 1_000_000),
+}
+CATEGORIES = ('Фильм', 'Книга', 'Музыка', 'Сериал', 'Игра')
+GENRES = ('Драма', 'Комедия', 'Триллер', 'Фантастика', 'Фэнтези',
+          'Детектив', 'Ужасы', 'Мелодрама', 'Приключения', 'Боевик',
+          'Документальный', 'Мультфильм', 'Рок', 'Джаз', 'Классика',
+          'Поп', 'Роман', 'Поэзия', 'Биография', 'Нон-фикшн')
+# Число жанров произведения и оценки: веса распределений.
+GENRE_COUNT_WEIGHTS = (60, 30, 10)
+SCORE_WEIGHTS = (2, 1, 2, 3, 5, 8, 13, 18, 16, 12)
+DAYS = 5 * 365
+
+
+class Buffer:
+    """Копит объекты модели и вставляет их пачками bulk_create."""
+
+    def __init__(self, model, batch_size, before_flush=None):
+        self.model = model
+        self.batch_size = batch_size
+        self.before_flush = before_flush
+        self.objects = []
+        self.count = 0
+
+    def add(self, obj):
+        self.objects.append(obj)
+        if len(self.objects) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.before_flush is not None:
+            self.before_flush()
+        if self.objects:
+            self.model.objects.bulk_create(self.objects)
+            self.count += len(self.objects)
+            self.objects = []
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def zipf_counts(total, items, cap, exponent, rng):
+    """Распределяет total отзывов по items произведениям по закону Ципфа,
+    не больше cap на произведение (один отзыв автора на произведение).
+    """
+    if total > items * cap:
+        raise CommandError(
+            'отзывов больше, чем пар «пользователь — произведение»'
+        )
+    weights = [1 / rank ** exponent for rank in range(1, items + 1)]
+    scale = total / sum(weights)
+    counts = [min(cap, int(weight * scale)) for weight in weights]
+    remainder = total - sum(counts)
+    index = 0
+    while remainder:
+        if counts[index] < cap:
+            counts[index] += 1
+            remainder -= 1
+        index = (index + 1) % items
+    rng.shuffle(counts)
+    return counts
+
+
+def power_law(rng, alpha, cap):
+    """Число комментариев к отзыву: большинство без комментариев,
+    редкие отзывы обсуждают долго.
+    """
+    return min(cap, int(rng.paretovariate(alpha)) - 1)
+
+
+class Command(BaseCommand):
+    help = ('генерация синтетического набора данных для нагрузочного '
+            'тестирования')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=SIZES, default='10k',
+                            help='размер набора по числу отзывов')
+        parser.add_argument('--reviews', type=int,
+                            help='число отзывов вместо заданного --size')
+        parser.add_argument('--titles', type=int,
+                            help='число произведений')
+        parser.add_argument('--users', type=int,
+                            help='число пользователей')
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='показатель закона Ципфа для отзывов')
+        parser.add_argument('--comments-alpha', type=float, default=1.5,
+                            help='показатель степенного закона комментариев')
+        parser.add_argument('--max-comments', type=int, default=200,
+                            help='наибольшее число комментариев к отзыву')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='зерно генератора случайных чисел')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='число строк в одной пачке bulk_create')
+
+    def handle(self, *args, **options):
+        reviews, titles, users = SIZES[options['size']]
+        reviews = options['reviews'] or reviews
+        titles = options['titles'] or titles
+        users = options['users'] or users
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        started = time.perf_counter()
+        counts = zipf_counts(reviews, titles, users, options['zipf'],
+                             self.rng)
+        with transaction.atomic():
+            user_ids = self.create_users(users)
+            category_ids = self.create_named(Category, CATEGORIES)
+            genre_ids = self.create_named(Genre, GENRES)
+            title_ids = self.create_titles(titles, category_ids, genre_ids)
+            self.create_reviews(title_ids, counts, user_ids,
+                                options['comments_alpha'],
+                                options['max_comments'])
+            for model in (CustomUser, Category, Genre, Title, TitleGenre,
+                          Review, Comment):
+                reset_sequences(model)
+            rebuild_title_ratings(Title.objects.filter(pk__in=title_ids))
+        rows_updated.send(sender=self.__class__, models=CHANGED_MODELS)
+        logging.info(
+            f'набор данных создан за {time.perf_counter() - started:.1f} с'
+        )
+
+    def log(self, name, count, started):
+        elapsed = time.perf_counter() - started
+        logging.info(f'{name}: {count} строк за {elapsed:.1f} с')
+
+    def random_date(self):
+        return self.now - datetime.timedelta(
+            seconds=self.rng.randrange(DAYS * 24 * 3600)
+        )
+
+    def create_users(self, count):
+        started = time.perf_counter()
+        first = next_id(CustomUser)
+        buffer = Buffer(CustomUser, self.batch_size)
+        for pk in range(first, first + count):
+            role = self.rng.choices(
+                (CustomUser.USER, CustomUser.MODERATOR, CustomUser.ADMIN),
+                (97, 2, 1),
+            )[0]
+            buffer.add(CustomUser(pk=pk, username=f'synthetic{pk}',
+                                  email=f'synthetic{pk}@yamdb.fake',
+                                  role=role))
+        buffer.flush()
+        self.log('пользователи', buffer.count, started)
+        return range(first, first + count)
+
+    def create_named(self, model, names):
+        first = next_id(model)
+        objects = [
+            model(pk=pk, name=f'{name} {pk}', slug=f'synthetic-{pk}')
+            for pk, name in enumerate(names, start=first)
+        ]
+        model.objects.bulk_create(objects)
+        return [obj.pk for obj in objects]
+
+    def create_titles(self, count, category_ids, genre_ids):
+        started = time.perf_counter()
+        first = next_id(Title)
+        link_id = next_id(TitleGenre)
+        genres = Buffer(TitleGenre, self.batch_size)
+        titles = Buffer(Title, self.batch_size)
+        genres.before_flush = titles.flush
+        for pk in range(first, first + count):
+            titles.add(Title(
+                pk=pk,
+                name=f'Произведение {pk}',
+                year=self.rng.randint(1900, self.now.year),
+                description=f'Синтетическое описание произведения {pk}',
+                category_id=self.rng.choice(category_ids),
+            ))
+            genre_count = self.rng.choices(
+                range(1, len(GENRE_COUNT_WEIGHTS) + 1), GENRE_COUNT_WEIGHTS
+            )[0]
+            for genre_id in self.rng.sample(genre_ids, genre_count):
+                genres.add(TitleGenre(pk=link_id, title_id=pk,
+                                      genre_id=genre_id))
+                link_id += 1
+        genres.flush()
+        self.log('произведения', titles.count, started)
+        self.log('жанры произведений', genres.count, started)
+        return range(first, first + count)
+
+    def create_reviews(self, title_ids, counts, user_ids, alpha,
+                       max_comments):
+        started = time.perf_counter()
+        review_id = next_id(Review)
+        comment_id = next_id(Comment)
+        reviews = Buffer(Review, self.batch_size)
+        comments = Buffer(Comment, self.batch_size,
+                          before_flush=reviews.flush)
+        for title_id, count in zip(title_ids, counts):
+            for author_id in self.rng.sample(user_ids, count):
+                pub_date = self.random_date()
+                reviews.add(Review(
+                    pk=review_id, title_id=title_id, author_id=author_id,
+                    text=f'Синтетический отзыв {review_id}',
+                    score=self.rng.choices(range(1, 11), SCORE_WEIGHTS)[0],
+                    pub_date=pub_date,
+                ))
+                for _ in range(power_law(self.rng, alpha, max_comments)):
+                    comments.add(Comment(
+                        pk=comment_id, review_id=review_id,
+                        author_id=self.rng.choice(user_ids),
+                        text=f'Синтетический комментарий {comment_id}',
+                        pub_date=min(self.now, pub_date + datetime.timedelta(
+                            seconds=self.rng.randrange(30 * 24 * 3600)
+                        )),
+                    ))
+                    comment_id += 1
+                review_id += 1
+        comments.flush()
+        self.log('отзывы', reviews.count, started)
+        self.log('комментарии', comments.count, started)
@@ -0,0 +1,23 @@
+from django.db import models
+
+
+class ImportedRow(models.Model):
+    """Хэш строки csv, загруженной командой filldatabase --upsert.
+
+    По хэшам предыдущей синхронизации определяется, какие строки
+    добавлены, изменены или удалены.
+    """
+    table = models.CharField(verbose_name='Файл', max_length=50)
+    row_id = models.IntegerField(verbose_name='id строки')
+    row_hash = models.CharField(verbose_name='Хэш строки', max_length=32)
+
+    class Meta:
+        verbose_name = 'Загруженная строка'
+        verbose_name_plural = 'Загруженные строки'
+        constraints = (
+            models.UniqueConstraint(fields=('table', 'row_id'),
+                                    name='unique_table_row'),
+        )
+
+    def __str__(self):
+        return f'{self.table}:{self.row_id}'
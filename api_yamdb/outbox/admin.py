@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from outbox.models import OutgoingEmail
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'to', 'subject', 'status', 'attempts',
+                    'next_attempt_at', 'sent_at')
+    list_filter = ('status',)
+    empty_value_display = '-пусто-'
+    ordering = ('-pk',)
@@ -0,0 +1,207 @@
+import logging
+import threading
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import DatabaseError, connections, transaction
+from django.utils import timezone
+
+from outbox.models import OutgoingEmail
+
+logger = logging.getLogger('outbox')
+
+DEFAULTS = {
+    'WORKER': None,
+    'BATCH_SIZE': 100,
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF': 30,
+    'MAX_BACKOFF': 3600,
+    'LEASE': 300,
+    'POLL_INTERVAL': 5,
+}
+# Бэкенды, письма которых сразу читаются из памяти процесса (тесты
+# проверяют mail.outbox после запроса): отправка в том же запросе.
+INLINE_BACKENDS = (
+    'django.core.mail.backends.locmem.EmailBackend',
+)
+
+
+def outbox_config():
+    return {**DEFAULTS, **getattr(settings, 'EMAIL_OUTBOX', {})}
+
+
+def worker_mode(config):
+    """inline — отправка в том же запросе, thread — фоновым потоком
+    процесса, command — только командой sendoutbox.
+    """
+    if config['WORKER']:
+        return config['WORKER']
+    return 'inline' if settings.EMAIL_BACKEND in INLINE_BACKENDS else 'thread'
+
+
+def enqueue(subject, body, to, from_email=None):
+    """Ставит письмо в очередь; отправка начинается после фиксации
+    транзакции.
+    """
+    message = OutgoingEmail.objects.create(
+        subject=subject, body=body, to=to,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+    config = outbox_config()
+    mode = worker_mode(config)
+    if mode == 'inline':
+        transaction.on_commit(lambda: send_batch(
+            claim(OutgoingEmail.objects.filter(pk=message.pk), 1), config
+        ))
+    elif mode == 'thread':
+        transaction.on_commit(worker.wake)
+    return message
+
+
+def claim(queryset, batch_size):
+    """Забирает в отправку до batch_size писем, чья очередь подошла;
+    письма, взятые другим обработчиком, не попадают в пачку.
+    """
+    now = timezone.now()
+    ids = list(queryset.filter(
+        status=OutgoingEmail.PENDING, next_attempt_at__lte=now,
+    ).order_by('next_attempt_at', 'id').values_list('pk', flat=True)[
+        :batch_size
+    ])
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    OutgoingEmail.objects.filter(
+        pk__in=ids, status=OutgoingEmail.PENDING,
+    ).update(status=OutgoingEmail.SENDING, claim=token, claimed_at=now)
+    return list(OutgoingEmail.objects.filter(pk__in=ids, claim=token))
+
+
+def release_expired(config):
+    """Возвращает в очередь письма обработчиков, которые не закончили
+    отправку за LEASE секунд.
+    """
+    expired = timezone.now() - timedelta(seconds=config['LEASE'])
+    return OutgoingEmail.objects.filter(
+        status=OutgoingEmail.SENDING, claimed_at__lt=expired,
+    ).update(status=OutgoingEmail.PENDING, claim='')
+
+
+def defer(message, error, config):
+    message.last_error = str(error) or type(error).__name__
+    if message.attempts >= config['MAX_ATTEMPTS']:
+        message.status = OutgoingEmail.FAILED
+        return
+    message.status = OutgoingEmail.PENDING
+    delay = min(config['BACKOFF'] * 2 ** (message.attempts - 1),
+                config['MAX_BACKOFF'])
+    message.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+
+def send_batch(messages, config):
+    """Отправляет письма через одно соединение с почтовым сервером
+    и записывает результат; возвращает Counter итоговых статусов.
+    """
+    if not messages:
+        return Counter()
+    mail_connection = get_connection()
+    try:
+        mail_connection.open()
+    except Exception as error:
+        for message in messages:
+            message.attempts += 1
+            defer(message, error, config)
+    else:
+        try:
+            for message in messages:
+                message.attempts += 1
+                try:
+                    mail_connection.send_messages([EmailMessage(
+                        message.subject, message.body, message.from_email,
+                        [message.to], connection=mail_connection,
+                    )])
+                except Exception as error:
+                    defer(message, error, config)
+                else:
+                    message.status = OutgoingEmail.SENT
+                    message.sent_at = timezone.now()
+                    message.last_error = ''
+        finally:
+            mail_connection.close()
+    for message in messages:
+        message.claim = ''
+    OutgoingEmail.objects.bulk_update(messages, (
+        'status', 'attempts', 'next_attempt_at', 'sent_at', 'last_error',
+        'claim',
+    ))
+    return Counter(message.status for message in messages)
+
+
+def deliver_pending(batch_size=None, config=None):
+    """Отправляет одну пачку писем из очереди."""
+    config = config or outbox_config()
+    release_expired(config)
+    return send_batch(
+        claim(OutgoingEmail.objects.all(),
+              batch_size or config['BATCH_SIZE']),
+        config,
+    )
+
+
+class OutboxWorker:
+    """Фоновый поток процесса, разбирающий очередь писем.
+
+    Поток запускается при старте сервера (см. autostart), просыпается
+    по wake() и раз в POLL_INTERVAL секунд: так отправляются и повторные
+    попытки, и письма, оставшиеся в очереди до перезапуска.
+    """
+
+    def __init__(self):
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if not self.is_alive():
+                self._thread = threading.Thread(
+                    target=self.run, name='outbox-worker', daemon=True
+                )
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def run(self):
+        while True:
+            config = outbox_config()
+            self._wake.wait(config['POLL_INTERVAL'])
+            self._wake.clear()
+            if worker_mode(config) != 'thread':
+                continue
+            try:
+                while deliver_pending(config=config):
+                    pass
+            except DatabaseError:
+                logger.exception('Ошибка при разборе очереди писем')
+            finally:
+                connections.close_all()
+
+
+worker = OutboxWorker()
+
+
+def autostart():
+    """Запускает фоновый поток в режиме thread. Вызывается из точек
+    входа сервера (wsgi.py, asgi.py); runserver загружает приложение
+    из WSGI_APPLICATION, поэтому тоже запускает поток.
+    """
+    if worker_mode(outbox_config()) == 'thread':
+        worker.start()
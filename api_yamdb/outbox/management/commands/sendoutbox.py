@@ -0,0 +1,47 @@
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from outbox.delivery import deliver_pending, outbox_config
+
+
+class Command(BaseCommand):
+    help = 'отправка писем из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='число писем, отправляемых через одно соединение',
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='не завершаться, ожидая новые письма',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=None,
+            help='пауза между проверками очереди в секундах',
+        )
+
+    def handle(self, *args, **options):
+        config = outbox_config()
+        interval = options['interval'] or config['POLL_INTERVAL']
+        totals = Counter()
+        while True:
+            statuses = deliver_pending(options['batch_size'], config)
+            totals.update(statuses)
+            if statuses:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(interval)
+        self.stdout.write(
+            f'Отправлено: {totals["sent"]}, '
+            f'отложено: {totals["pending"]}, '
+            f'не доставлено: {totals["failed"]}'
+        )
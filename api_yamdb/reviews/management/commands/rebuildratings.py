@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+
+from reviews.models import Title
+from reviews.rating import rebuild_title_ratings, review_aggregates
+from reviews.signals import rows_updated
+
+
+class Command(BaseCommand):
+    help = ('пересчёт сохранённых рейтингов произведений по отзывам '
+            'с отчётом о расхождениях')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='только показать расхождения, ничего не изменяя',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            # NULL рейтинга без отзывов сравнивается через Coalesce:
+            # NULL = NULL в SQL не истинно.
+            drifted = review_aggregates(Title.objects.all()).annotate(
+                stored=Coalesce('rating', Value(-1)),
+                actual=Coalesce('actual_rating', Value(-1)),
+            ).filter(
+                ~Q(rating_sum=F('actual_sum'))
+                | ~Q(review_count=F('actual_count'))
+                | ~Q(stored=F('actual'))
+            ).order_by('pk')
+            drift_count = 0
+            for title in drifted.iterator():
+                drift_count += 1
+                self.stdout.write(
+                    f'id={title.pk} «{title.name}»: '
+                    f'сумма {title.rating_sum} -> {title.actual_sum}, '
+                    f'отзывов {title.review_count} -> {title.actual_count}, '
+                    f'рейтинг {title.rating} -> {title.actual_rating}'
+                )
+            if options['dry_run']:
+                self.stdout.write(f'расхождений найдено: {drift_count}')
+                return
+            rebuild_title_ratings()
+        rows_updated.send(sender=self.__class__, models=(Title,))
+        self.stdout.write(self.style.SUCCESS(
+            f'рейтинги пересчитаны, исправлено расхождений: {drift_count}'
+        ))
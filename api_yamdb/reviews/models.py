@@ -1,8 +1,9 @@
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
+from reviews.utils import SearchDocumentField
 from reviews.validators import validate_year
 
 
@@ -17,6 +18,7 @@ class Category(models.Model):
     slug = models.SlugField(
         verbose_name='Адрес категории',
         max_length=50,
+        unique=True,
     )
 
     class Meta:
@@ -41,6 +43,7 @@ class Genre(models.Model):
     slug = models.SlugField(
         verbose_name='Адрес жанра',
         max_length=50,
+        unique=True,
     )
 
     class Meta:
@@ -84,16 +87,58 @@ class Title(models.Model):
         on_delete=models.SET_NULL,
         null=True,
     )
+    rating_sum = models.PositiveIntegerField(
+        verbose_name='Сумма оценок',
+        default=0,
+        editable=False,
+    )
+    review_count = models.PositiveIntegerField(
+        verbose_name='Количество отзывов',
+        default=0,
+        editable=False,
+    )
+    rating = models.PositiveSmallIntegerField(
+        verbose_name='Рейтинг',
+        null=True,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'Произведение'
         verbose_name_plural = 'Произведения'
         ordering = ('-year',)
+        indexes = (
+            models.Index(fields=('-year', 'id'), name='title_year_id_idx'),
+            models.Index(fields=('category', '-year', 'id'),
+                         name='title_category_year_idx'),
+            models.Index(fields=('rating', '-year', 'id'),
+                         name='title_rating_year_idx'),
+        )
 
     def __str__(self):
         return self.name
 
 
+class TitleSearchIndex(models.Model):
+    """Полнотекстовый индекс SQLite FTS5 по названию и описанию
+    произведений. Таблица и триггеры, синхронизирующие её с Title,
+    создаются миграцией 0005 (см. reviews.search).
+    """
+    title = models.OneToOneField(
+        Title,
+        primary_key=True,
+        db_column='rowid',
+        on_delete=models.DO_NOTHING,
+        related_name='search_index',
+    )
+    document = SearchDocumentField(db_column='reviews_title_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'reviews_title_fts'
+
+
 class Review(models.Model):
     """Модель для отзыва."""
     text = models.TextField(verbose_name='Текст отзыва')
@@ -101,6 +146,10 @@ class Review(models.Model):
         default=timezone.now,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -128,6 +177,12 @@ class Review(models.Model):
         verbose_name = 'Отзыв'
         verbose_name_plural = 'Отзывы'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('title', '-pub_date', 'id'),
+                         name='review_title_pub_date_idx'),
+            models.Index(fields=('title', 'updated_at'),
+                         name='review_title_updated_idx'),
+        )
         constraints = (
             models.UniqueConstraint(fields=('author', 'title'),
                                     name='unique_author_title'),
@@ -136,6 +191,18 @@ class Review(models.Model):
     def __str__(self):
         return f'Произведение: {str(self.title)[:15]}, Автор: {self.author}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_score = instance.__dict__.get('score')
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Отзыв и счётчики рейтинга произведения (см. reviews.signals)
+        # сохраняются в одной транзакции.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
 
 class Comment(models.Model):
     """Модель для комментария к отзыву."""
@@ -150,6 +217,10 @@ class Comment(models.Model):
         default=timezone.now,
         verbose_name='Дата добавления'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
     review = models.ForeignKey(
         Review,
         on_delete=models.CASCADE,
@@ -161,6 +232,12 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('review', '-pub_date', 'id'),
+                         name='comment_review_pub_date_idx'),
+            models.Index(fields=('review', 'updated_at'),
+                         name='comment_review_updated_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -0,0 +1,61 @@
+from django.db.models import (Case, Count, F, IntegerField, OuterRef,
+                              Subquery, Sum, Value, When)
+from django.db.models.functions import Coalesce, NullIf
+
+from reviews.models import Review, Title
+
+
+def _rating_expression(rating_sum, review_count, empty_count):
+    return Case(
+        When(review_count=empty_count, then=Value(None)),
+        default=rating_sum / review_count,
+        output_field=IntegerField(),
+    )
+
+
+def update_title_rating(title_id, score_delta, count_delta):
+    """Атомарно изменяет сумму оценок, число отзывов и рейтинг
+    произведения одним UPDATE без чтения строки, возвращает число
+    изменённых строк.
+    """
+    new_sum = F('rating_sum') + score_delta
+    new_count = F('review_count') + count_delta
+    return Title.objects.filter(pk=title_id).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        rating=_rating_expression(new_sum, new_count, -count_delta),
+    )
+
+
+def review_aggregates(titles):
+    """Возвращает queryset произведений с суммой, числом оценок
+    и рейтингом, посчитанными по таблице отзывов.
+    """
+    return titles.annotate(
+        actual_sum=Coalesce(Sum('reviews__score'), 0),
+        actual_count=Count('reviews'),
+    ).annotate(
+        actual_rating=F('actual_sum') / NullIf(F('actual_count'), Value(0)),
+    )
+
+
+def rebuild_title_ratings(titles=None):
+    """Пересчитывает сохранённые рейтинги произведений с нуля."""
+    if titles is None:
+        titles = Title.objects.all()
+    reviews = Review.objects.filter(
+        title=OuterRef('pk')
+    ).order_by().values('title')
+    titles.update(
+        rating_sum=Coalesce(
+            Subquery(reviews.annotate(total=Sum('score')).values('total')),
+            0,
+        ),
+        review_count=Coalesce(
+            Subquery(reviews.annotate(total=Count('pk')).values('total')),
+            0,
+        ),
+    )
+    titles.update(
+        rating=_rating_expression(F('rating_sum'), F('review_count'), 0)
+    )
@@ -0,0 +1,85 @@
+"""Полнотекстовый поиск произведений по индексу SQLite FTS5.
+
+Индекс reviews_title_fts хранит только токены (content='reviews_title')
+и поддерживается триггерами базы данных, поэтому синхронизирован
+с Title при любых изменениях, включая bulk_create и queryset.update().
+Токенизатор trigram позволяет искать подстроки длиной от трёх символов
+без учёта регистра, как icontains, но по индексу.
+
+Таблица и триггеры создаются миграцией reviews 0005. Если база данных
+не SQLite или в SQLite нет токенизатора trigram (версии до 3.34),
+миграция индекс не создаёт, и поиск выполняется через icontains.
+"""
+from django.db import connections
+from django.db.models import Q
+
+from reviews.models import Title, TitleSearchIndex
+
+FTS_TABLE = TitleSearchIndex._meta.db_table
+MIN_TERM_LENGTH = 3
+
+_available = {}
+
+
+def rebuild_search_index(using='default'):
+    """Перестраивает индекс по таблице произведений."""
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+        )
+
+
+def search_index_available(using='default'):
+    if using not in _available:
+        connection = connections[using]
+        _available[using] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _available[using]
+
+
+def _phrase(text):
+    return '"{}"'.format(text.replace('"', '""'))
+
+
+def search_terms(query):
+    return [term for term in query.split() if term]
+
+
+def search_titles(queryset, query):
+    """Отбирает произведения, в названии или описании которых есть все
+    слова запроса, и сортирует их по релевантности (bm25).
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset
+    indexed = [term for term in terms if len(term) >= MIN_TERM_LENGTH]
+    if not search_index_available(queryset.db) or not indexed:
+        condition = Q()
+        for term in terms:
+            condition &= (Q(name__icontains=term)
+                          | Q(description__icontains=term))
+        return queryset.filter(condition)
+    queryset = queryset.filter(
+        search_index__document__match=' AND '.join(map(_phrase, indexed))
+    )
+    for term in terms:
+        if len(term) < MIN_TERM_LENGTH:
+            queryset = queryset.filter(Q(name__icontains=term)
+                                       | Q(description__icontains=term))
+    ordering = queryset.query.order_by or Title._meta.ordering
+    return queryset.order_by('search_index__rank', *ordering)
+
+
+def filter_titles_by_name(queryset, value):
+    """Аналог name__icontains, использующий индекс для подстрок
+    от трёх символов.
+    """
+    if (len(value) < MIN_TERM_LENGTH
+            or not search_index_available(queryset.db)):
+        return queryset.filter(name__icontains=value)
+    matches = TitleSearchIndex.objects.using(queryset.db).filter(
+        document__match=f'name : {_phrase(value)}'
+    ).values('title')
+    return queryset.filter(pk__in=matches)
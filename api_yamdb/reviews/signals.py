@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from reviews.models import Review, Title
+from reviews.rating import rebuild_title_ratings, update_title_rating
+
+# Строки моделей models изменены в обход сигналов post_save
+# и post_delete (QuerySet.update(), bulk_create, bulk_update).
+rows_updated = Signal(providing_args=['models'])
+
+
+@receiver(post_save, sender=Review)
+def review_saved(sender, instance, created, **kwargs):
+    """Учитывает в рейтинге новый отзыв или изменённую оценку."""
+    if created:
+        update_title_rating(instance.title_id, instance.score, 1)
+    else:
+        old_score = getattr(instance, '_loaded_score', None)
+        if old_score is None:
+            # Прежняя оценка неизвестна: пересчитываем по таблице отзывов.
+            rebuild_title_ratings(
+                Title.objects.filter(pk=instance.title_id)
+            )
+        elif instance.score != old_score:
+            update_title_rating(instance.title_id,
+                                instance.score - old_score, 0)
+    instance._loaded_score = instance.score
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    """Убирает из рейтинга удалённый отзыв, в том числе при каскадном
+    удалении автора.
+    """
+    update_title_rating(instance.title_id, -instance.score, -1)
@@ -6,3 +6,19 @@ class NameField(models.CharField):
 
     def to_python(self, value):
         return value.lower()
+
+
+class SearchDocumentField(models.TextField):
+    """Служебный столбец полнотекстового индекса SQLite FTS5,
+    совпадающий по имени с таблицей индекса; по нему выполняется MATCH.
+    """
+
+
+@SearchDocumentField.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
@@ -49,6 +49,11 @@ class CustomUser(AbstractUser):
         choices=ROLES,
         default=USER
     )
+    token_version = models.PositiveIntegerField(
+        verbose_name='Версия токенов',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('id',)
@@ -58,10 +63,28 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_access = instance.access_state()
+        return instance
+
+    def access_state(self):
+        return self.__dict__.get('role'), self.__dict__.get('is_active')
+
     def save(self, *args, **kwargs):
         if self.is_superuser:
             self.role = self.ADMIN
+        loaded = getattr(self, '_loaded_access', None)
+        if loaded is not None and loaded != self.access_state():
+            # Токены с прежней ролью или активностью становятся
+            # недействительными (см. api.v1.authentication).
+            self.token_version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'],
+                                           'token_version'}
         super(CustomUser, self).save(*args, **kwargs)
+        self._loaded_access = self.access_state()
 
     @property
     def is_admin(self):
@@ -0,0 +1,14 @@
+# Бенчмарки запускаются отдельно от тестов:
+#     pytest benchmarks/ -s
+# Базовые значения бенчмарков маршрутов обновляются на эталонной машине:
+#     pytest benchmarks/ --update-baselines
+pytest_plugins = [
+    'tests.fixtures.fixture_user',
+]
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--update-baselines', action='store_true',
+        help='записать замеры маршрутов в benchmarks/baselines.json',
+    )
@@ -0,0 +1,69 @@
+import time
+
+import pytest
+
+from tests.common import auth_client, create_titles, create_users_api
+
+POLLS = 200
+
+
+def poll(client, url, etag=None):
+    """Опрашивает url POLLS раз, возвращает переданные байты
+    и процессорное время.
+    """
+    headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+    received = 0
+    started = time.process_time()
+    for _ in range(POLLS):
+        response = client.get(url, **headers)
+        received += len(response.content) + sum(
+            len(key) + len(value) for key, value in response.items()
+        )
+    return received, time.process_time() - started
+
+
+def report(name, full, conditional):
+    (full_bytes, full_cpu), (cond_bytes, cond_cpu) = full, conditional
+    print(
+        f'\n{name}: {POLLS} опросов\n'
+        f'  без ETag:   {full_bytes:>9} байт, {full_cpu * 1000:8.1f} мс CPU\n'
+        f'  с ETag/304: {cond_bytes:>9} байт, {cond_cpu * 1000:8.1f} мс CPU\n'
+        f'  экономия:   {1 - cond_bytes / full_bytes:.0%} байт, '
+        f'{1 - cond_cpu / full_cpu:.0%} CPU'
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.parametrize('collection', ('reviews', 'comments'))
+def test_repeated_polls(client, admin_client, collection):
+    from reviews.models import Comment, Review
+    from users.models import CustomUser
+    titles, _, _ = create_titles(admin_client)
+    title_id = titles[0]['id']
+    create_users_api(admin_client)
+    for i in range(5):
+        admin_client.post('/api/v1/users/', data={
+            'username': f'poller{i}', 'email': f'poller{i}@yamdb.fake'
+        })
+    authors = list(CustomUser.objects.all())
+    for i, author in enumerate(authors):
+        auth_client(author).post(
+            f'/api/v1/titles/{title_id}/reviews/',
+            data={'text': 'Текст отзыва ' * 20, 'score': i % 10 + 1},
+        )
+    review = Review.objects.filter(title=title_id).first()
+    Comment.objects.bulk_create(
+        Comment(review=review, author=authors[i % len(authors)],
+                text='Текст комментария ' * 10)
+        for i in range(50)
+    )
+    url = f'/api/v1/titles/{title_id}/reviews/'
+    if collection == 'comments':
+        url = f'{url}{review.pk}/comments/'
+    etag = client.get(url)['ETag']
+
+    full = poll(client, url)
+    conditional = poll(client, url, etag)
+    report(url, full, conditional)
+    assert conditional[0] < full[0] / 2
+    assert conditional[1] < full[1]
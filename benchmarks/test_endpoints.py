@@ -0,0 +1,264 @@
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from tests.common import LARGE_TABLES, auth_client, scanned_tables
+
+BASELINES = os.path.join(os.path.dirname(__file__), 'baselines.json')
+# Размер набора данных: отзывы, произведения, пользователи.
+DATASET = ('2000', '100', '400')
+ROUNDS = 100
+# Допуски к базовым значениям: время зависит от машины, память — нет;
+# хвост распределения шумнее медианы, поэтому допуск p95 вдвое шире.
+LATENCY_TOLERANCE = float(os.environ.get('BENCHMARK_LATENCY_TOLERANCE', 1.5))
+MEMORY_TOLERANCE = 1.25
+
+results = {}
+
+
+@pytest.fixture(scope='module')
+def dataset(django_db_setup, django_db_blocker, request):
+    from reviews.models import Category, Review, Title
+    from users.models import CustomUser
+    with django_db_blocker.unblock():
+        reviews, titles, users = DATASET
+        call_command('generatedata', '--reviews', reviews, '--titles', titles,
+                     '--users', users, '--seed', '1')
+        title = Title.objects.order_by('-review_count').first()
+        quiet_title = Title.objects.order_by('review_count', 'pk').first()
+        review = Review.objects.annotate(
+            comment_count=Count('comments')
+        ).order_by('-comment_count', 'pk').first()
+        free_authors = CustomUser.objects.exclude(
+            reviews__title=quiet_title
+        ).order_by('pk')[:ROUNDS + 3]
+        data = SimpleNamespace(
+            title=title,
+            quiet_title=quiet_title,
+            genre=title.genre.first().slug,
+            genres=','.join(title.genre.values_list('slug', flat=True)[:2]),
+            categories=','.join(
+                Category.objects.values_list('slug', flat=True)[:2]
+            ),
+            year=title.year,
+            review=review,
+            anonymous=APIClient(),
+            admin=auth_client(CustomUser.objects.create_user(
+                username='bench-admin', email='bench-admin@yamdb.fake',
+                role=CustomUser.ADMIN,
+            )),
+            user=auth_client(review.author),
+            authors=[auth_client(author) for author in free_authors],
+            token_user=CustomUser.objects.filter(role=CustomUser.USER).first(),
+        )
+        yield data
+        if request.config.getoption('--update-baselines'):
+            with open(BASELINES, 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+                file.write('\n')
+        call_command('flush', interactive=False, verbosity=0)
+
+
+def titles_list(data, i):
+    return data.anonymous.get('/api/v1/titles/')
+
+
+def titles_filter(data, i):
+    return data.anonymous.get(
+        '/api/v1/titles/', {'genre': data.genre, 'name': 'Произведение 1'}
+    )
+
+
+def titles_genres_any(data, i):
+    return data.anonymous.get('/api/v1/titles/', {'genre': data.genres})
+
+
+def titles_genres_all(data, i):
+    return data.anonymous.get('/api/v1/titles/', {
+        'genre': data.genres, 'genre_match': 'all',
+    })
+
+
+def titles_ranges(data, i):
+    return data.anonymous.get('/api/v1/titles/', {
+        'category__in': data.categories, 'year_min': data.year - 5,
+        'year_max': data.year + 5, 'rating_min': 5,
+    })
+
+
+def titles_retrieve(data, i):
+    return data.anonymous.get(f'/api/v1/titles/{data.title.pk}/')
+
+
+def reviews_list(data, i):
+    return data.anonymous.get(f'/api/v1/titles/{data.title.pk}/reviews/')
+
+
+def reviews_create(data, i):
+    return data.authors[i].post(
+        f'/api/v1/titles/{data.quiet_title.pk}/reviews/',
+        data={'text': 'Отзыв из бенчмарка', 'score': i % 10 + 1},
+    )
+
+
+def comments_url(data):
+    return (f'/api/v1/titles/{data.review.title_id}/reviews/'
+            f'{data.review.pk}/comments/')
+
+
+def comments_list(data, i):
+    return data.anonymous.get(comments_url(data))
+
+
+def comments_create(data, i):
+    return data.user.post(comments_url(data),
+                          data={'text': 'Комментарий из бенчмарка'})
+
+
+def users_list(data, i):
+    return data.admin.get('/api/v1/users/')
+
+
+def signup(data, i):
+    return data.anonymous.post('/api/v1/auth/signup/', data={
+        'username': f'bench{i}', 'email': f'bench{i}@yamdb.fake'
+    })
+
+
+def token(data, i):
+    from django.contrib.auth.tokens import default_token_generator
+    return data.anonymous.post('/api/v1/auth/token/', data={
+        'username': data.token_user.username,
+        'confirmation_code': default_token_generator.make_token(
+            data.token_user
+        ),
+    })
+
+
+ROUTES = {
+    'titles-list': (titles_list, 200),
+    'titles-filter': (titles_filter, 200),
+    'titles-genres-any': (titles_genres_any, 200),
+    'titles-genres-all': (titles_genres_all, 200),
+    'titles-ranges': (titles_ranges, 200),
+    'titles-retrieve': (titles_retrieve, 200),
+    'reviews-list': (reviews_list, 200),
+    'reviews-create': (reviews_create, 201),
+    'comments-list': (comments_list, 200),
+    'comments-create': (comments_create, 201),
+    'users-list': (users_list, 200),
+    'signup': (signup, 200),
+    'token': (token, 200),
+}
+
+
+def measure(data, send, expected_status):
+    """Замеряет запросы к базе, пиковую память и перцентили времени
+    ответа маршрута; кеш ответов и корзины ограничения частоты
+    сбрасываются перед каждым запросом.
+    """
+    from api.v1.cache import response_cache
+    from api.v1.throttling import reset_throttles
+
+    def call(i):
+        response_cache.clear()
+        reset_throttles()
+        response = send(data, i)
+        assert response.status_code == expected_status, response.content
+        return response
+
+    call(0)
+    with CaptureQueriesContext(connection) as context:
+        call(1)
+    queries = len(context)
+    tracemalloc.start()
+    call(2)
+    memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    timings = []
+    for i in range(3, ROUNDS + 3):
+        started = time.perf_counter()
+        call(i)
+        timings.append((time.perf_counter() - started) * 1000)
+    percentiles = statistics.quantiles(timings, n=100)
+    return {
+        'queries': queries,
+        'p50_ms': round(percentiles[49], 2),
+        'p95_ms': round(percentiles[94], 2),
+        'p99_ms': round(percentiles[98], 2),
+        'memory_kb': round(memory / 1024),
+    }
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES):
+        return {}
+    with open(BASELINES, encoding='utf-8') as file:
+        return json.load(file)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('route', ROUTES)
+def test_endpoint(dataset, route, request):
+    send, expected_status = ROUTES[route]
+    result = results[route] = measure(dataset, send, expected_status)
+    print(f'\n{route}: {result}')
+    if request.config.getoption('--update-baselines'):
+        return
+    baseline = load_baselines().get(route)
+    assert baseline, (
+        f'Нет базовых значений для {route}: '
+        'запустите pytest benchmarks/ --update-baselines'
+    )
+    assert result['queries'] <= baseline['queries'], (
+        f'{route}: запросов к базе {result["queries"]}, '
+        f'базовое значение {baseline["queries"]}'
+    )
+    assert result['p50_ms'] <= baseline['p50_ms'] * LATENCY_TOLERANCE, (
+        f'{route}: p50 {result["p50_ms"]} мс, '
+        f'базовое значение {baseline["p50_ms"]} мс'
+    )
+    assert result['p95_ms'] <= baseline['p95_ms'] * LATENCY_TOLERANCE * 2, (
+        f'{route}: p95 {result["p95_ms"]} мс, '
+        f'базовое значение {baseline["p95_ms"]} мс'
+    )
+    assert result['memory_kb'] <= baseline['memory_kb'] * MEMORY_TOLERANCE, (
+        f'{route}: пиковая память {result["memory_kb"]} КБ, '
+        f'базовое значение {baseline["memory_kb"]} КБ'
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('route', ('titles-filter', 'titles-genres-any',
+                                   'titles-genres-all', 'titles-ranges'))
+def test_filter_query_plan(dataset, route):
+    """Фильтры произведений не просматривают большие таблицы целиком."""
+    from api.v1.cache import response_cache
+    from api.v1.slowqueries import explain
+    send, expected_status = ROUTES[route]
+    captured = []
+
+    def capture(execute, sql, params, many, context):
+        if not many:
+            captured.append((sql, params))
+        return execute(sql, params, many, context)
+
+    response_cache.clear()
+    with connection.execute_wrapper(capture):
+        assert send(dataset, 0).status_code == expected_status
+    assert captured
+    for sql, params in captured:
+        tables = scanned_tables(explain(connection, sql, params),
+                                sql) & LARGE_TABLES
+        assert not tables, f'{route}: полный просмотр {tables}\n{sql}'
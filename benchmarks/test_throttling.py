@@ -0,0 +1,18 @@
+import time
+
+CHECKS = 10_000
+
+
+def test_check_overhead():
+    from api.v1.throttling import LocalBucketStore
+    store = LocalBucketStore()
+    keys = [f'ip:10.0.0.{index % 256}' for index in range(CHECKS)]
+    started = time.perf_counter()
+    for key in keys:
+        store.take_all(((key, 1000, 10), (f'username:{key}', 1000, 10)))
+    per_check = (time.perf_counter() - started) / CHECKS
+    print(f'\nпроверка лимита: {per_check * 1e6:.1f} мкс на запрос')
+    assert per_check < 100e-6, (
+        'Проверьте, что проверка лимита занимает микросекунды, '
+        f'а не {per_check * 1e6:.1f} мкс'
+    )
@@ -0,0 +1,41 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from tests.common import LARGE_TABLES, scanned_tables
+
+# Каталог, на котором обход всего индекса произведений заметен:
+# отзывы, произведения, пользователи.
+CATALOG = ('4000', '2000', '300')
+
+
+@pytest.mark.django_db(transaction=True)
+def test_rating_filter_plan(client):
+    """Фильтр rating_min без других фильтров ищет по индексу рейтинга,
+    а не обходит все произведения.
+    """
+    from api.v1.cache import response_cache
+    from api.v1.slowqueries import explain
+    reviews, titles, users = CATALOG
+    call_command('generatedata', '--reviews', reviews, '--titles', titles,
+                 '--users', users, '--seed', '1')
+    captured = []
+
+    def capture(execute, sql, params, many, context):
+        if not many:
+            captured.append((sql, params))
+        return execute(sql, params, many, context)
+
+    for rating in (1, 5, 9):
+        response_cache.clear()
+        captured.clear()
+        with connection.execute_wrapper(capture):
+            response = client.get('/api/v1/titles/', {'rating_min': rating})
+        assert response.status_code == 200
+        assert captured
+        for sql, params in captured:
+            tables = scanned_tables(explain(connection, sql, params),
+                                    sql) & LARGE_TABLES
+            assert not tables, (
+                f'rating_min={rating}: полный просмотр {tables}\n{sql}'
+            )
@@ -1,7 +1,32 @@
+import re
+
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework_simplejwt.tokens import RefreshToken
 
+# Таблицы, растущие с числом пользователей и отзывов: полный просмотр
+# любой из них в плане запроса обработчика — регрессия.
+LARGE_TABLES = {'reviews_title', 'reviews_title_genre', 'reviews_review',
+                'reviews_comment', 'users_customuser'}
+TABLE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+
+def scanned_tables(plan, sql=''):
+    """Таблицы, которые план просматривает целиком, в том числе
+    обходом всего индекса (SCAN ... USING INDEX). Просмотр без условия
+    WHERE и без сортировки во временном B-дереве с LIMIT идёт в порядке
+    ключа, останавливается на первых строках и полным не считается.
+    """
+    if (' LIMIT ' in sql and ' WHERE ' not in sql
+            and not any('TEMP B-TREE' in line for line in plan)):
+        return set()
+    tables = set()
+    for line in plan:
+        match = TABLE_SCAN.match(line)
+        if match and 'VIRTUAL TABLE' not in line:
+            tables.add(match.group(1))
+    return tables
+
 
 def create_users_api(admin_client):
     data = {
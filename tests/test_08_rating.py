@@ -0,0 +1,70 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from .common import create_reviews
+
+
+class Test08TitleRating:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_rating_author_cascade_delete(self, admin_client, admin):
+        from reviews.models import Title
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.review_count, title.rating) == (12, 3, 4), (
+            'Проверьте, что при создании отзыва обновляются `rating_sum`, `review_count` и `rating` произведения'
+        )
+        user.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.review_count, title.rating) == (9, 2, 4), (
+            'Проверьте, что при каскадном удалении автора отзыва пересчитывается рейтинг произведения'
+        )
+        moderator.delete()
+        admin.delete()
+        title.refresh_from_db()
+        assert (title.rating_sum, title.review_count, title.rating) == (0, 0, None), (
+            'Проверьте, что у произведения без отзывов `rating` равен `None`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_rebuild_ratings_command(self, admin_client, admin):
+        from reviews.models import Title
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        Title.objects.filter(pk=titles[0]['id']).update(
+            rating_sum=100, review_count=1, rating=100
+        )
+        out = StringIO()
+        call_command('rebuildratings', '--dry-run', stdout=out)
+        assert 'расхождений найдено: 1' in out.getvalue(), (
+            'Проверьте, что команда `rebuildratings --dry-run` сообщает о расхождениях'
+        )
+        assert Title.objects.get(pk=titles[0]['id']).rating == 100
+        out = StringIO()
+        call_command('rebuildratings', stdout=out)
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.rating_sum, title.review_count, title.rating) == (12, 3, 4), (
+            'Проверьте, что команда `rebuildratings` пересчитывает рейтинги'
+        )
+        response = admin_client.get(f'/api/v1/titles/{titles[1]["id"]}/')
+        assert response.json().get('rating') is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_rebuild_drifted_rating_only(self, admin_client, admin):
+        from reviews.models import Title
+        reviews, titles, user, moderator = create_reviews(admin_client, admin)
+        Title.objects.filter(pk=titles[0]['id']).update(rating=9)
+        Title.objects.filter(pk=titles[1]['id']).update(rating=7)
+        out = StringIO()
+        call_command('rebuildratings', '--dry-run', stdout=out)
+        assert 'расхождений найдено: 2' in out.getvalue(), (
+            'Проверьте, что `rebuildratings` сверяет и сохранённый `rating`'
+        )
+        call_command('rebuildratings', stdout=StringIO())
+        assert dict(Title.objects.values_list('pk', 'rating')) == {
+            titles[0]['id']: 4, titles[1]['id']: None,
+        }
+        out = StringIO()
+        call_command('rebuildratings', '--dry-run', stdout=out)
+        assert 'расхождений найдено: 0' in out.getvalue()
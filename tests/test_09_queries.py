@@ -0,0 +1,116 @@
+import pytest
+
+from .common import auth_client, create_comments, create_titles
+
+
+class Test09QueryCount:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_query_count(self, client, admin_client,
+                                   django_assert_num_queries):
+        titles, _, _ = create_titles(admin_client)
+        extra_titles = [
+            {'name': f'Произведение {i}', 'year': 2000 + i,
+             'genre': [titles[0]['genre'][i % 2]],
+             'category': titles[i % 2]['category']}
+            for i in range(3)
+        ]
+        for data in extra_titles:
+            admin_client.post('/api/v1/titles/', data=data)
+        # count, страница произведений с категориями, жанры страницы
+        with django_assert_num_queries(3):
+            response = client.get('/api/v1/titles/')
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 5
+        # произведение с категорией, жанры
+        with django_assert_num_queries(2):
+            response = client.get(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert response.status_code == 200
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_reviews_comments_query_count(self, client, admin_client, admin,
+                                             django_assert_num_queries):
+        comments, reviews, titles, user, _ = create_comments(admin_client, admin)
+        title_id = titles[0]['id']
+        review_id = reviews[0]['id']
+        # валидатор ETag, произведение, count, страница отзывов с авторами
+        with django_assert_num_queries(4):
+            response = client.get(f'/api/v1/titles/{title_id}/reviews/')
+        assert len(response.json()['results']) == len(reviews)
+        with django_assert_num_queries(3):
+            client.get(f'/api/v1/titles/{title_id}/reviews/{review_id}/')
+        # валидатор ETag, отзыв, count, страница комментариев с авторами
+        with django_assert_num_queries(4):
+            response = client.get(
+                f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+            )
+        assert len(response.json()['results']) == len(comments)
+        with django_assert_num_queries(3):
+            client.get(
+                f'/api/v1/titles/{title_id}/reviews/{review_id}/comments/'
+                f'{comments[0]["id"]}/'
+            )
+        # пользователь уже в кэше аутентификации: запрос с токеном
+        # не добавляет запросов к базе, а валидатор ETag безусловного
+        # запроса берётся из кэша
+        with django_assert_num_queries(3):
+            auth_client(user).get(f'/api/v1/titles/{title_id}/reviews/')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_review_create_query_count(self, admin_client, admin):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        from reviews.models import Review, Title
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        client = auth_client(admin)
+        # INSERT отзыва и UPDATE рейтинга в одной транзакции: произведение
+        # проверяет внешний ключ, пользователь токена уже в кэше
+        # аутентификации
+        with CaptureQueriesContext(connection) as context:
+            response = client.post(url, data={'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 201
+        statements = [query['sql'] for query in context
+                      if query['sql'] not in ('BEGIN', 'COMMIT')]
+        assert len(statements) == 2, (
+            'Проверьте, что создание отзыва выполняет два запроса: '
+            f'{statements}'
+        )
+        response = client.post(url, data={'text': 'Ещё отзыв', 'score': 1})
+        assert response.status_code == 400
+        assert 'Больше одного отзыва' in str(response.json())
+        response = client.post('/api/v1/titles/999/reviews/',
+                               data={'text': 'Отзыв', 'score': 7})
+        assert response.status_code == 404
+        assert Review.objects.count() == 1
+        title = Title.objects.get(pk=titles[0]['id'])
+        assert (title.review_count, title.rating) == (1, 7), (
+            'Проверьте, что отклонённые отзывы не меняют рейтинг'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_review_integrity_errors(self, admin_client, admin):
+        from rest_framework.exceptions import NotFound, ValidationError
+
+        from api.v1.serializers import ReviewSerializer
+        from reviews.models import Review
+        titles, _, _ = create_titles(admin_client)
+        serializer = ReviewSerializer(data={'text': 'Отзыв', 'score': 5})
+        assert serializer.is_valid()
+        # Произведение удалено между проверкой во вьюсете и вставкой:
+        # внешний ключ нарушен, но это не повторный отзыв
+        with pytest.raises(NotFound):
+            serializer.save(author=admin, title_id=999)
+        assert not Review.objects.exists(), (
+            'Проверьте, что отзыв к несуществующему произведению '
+            'не сохраняется'
+        )
+        serializer.save(author=admin, title_id=titles[0]['id'])
+        serializer = ReviewSerializer(data={'text': 'Ещё', 'score': 5})
+        assert serializer.is_valid()
+        with pytest.raises(ValidationError) as error:
+            serializer.save(author=admin, title_id=titles[0]['id'])
+        assert 'Больше одного отзыва' in str(error.value), (
+            'Проверьте, что повторный отзыв отклоняется с понятной ошибкой'
+        )
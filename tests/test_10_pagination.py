@@ -0,0 +1,136 @@
+import json
+from base64 import b64encode
+
+import pytest
+
+from .common import create_categories, create_genre, create_reviews
+
+
+def cursor(values, reverse=False):
+    payload = json.dumps({'v': values, 'r': reverse}).encode('utf-8')
+    return b64encode(payload).decode('ascii')
+
+
+class Test10CursorPagination:
+
+    def collect(self, client, url):
+        pages = []
+        while url:
+            response = client.get(url)
+            assert response.status_code == 200, (
+                f'Проверьте, что при GET запросе `{url}` возвращается статус 200'
+            )
+            data = response.json()
+            assert 'count' not in data, (
+                'Проверьте, что пагинация по курсору не считает `count`'
+            )
+            pages.append(data)
+            url = data['next']
+        return pages
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_cursor(self, client, admin_client):
+        genres = create_genre(admin_client)
+        categories = create_categories(admin_client)
+        for i in range(12):
+            data = {'name': f'Произведение {i}', 'year': 2000 + i // 3,
+                    'genre': [genres[0]['slug']],
+                    'category': categories[0]['slug']}
+            admin_client.post('/api/v1/titles/', data=data)
+        pages = self.collect(client, '/api/v1/titles/?pagination=cursor')
+        assert [len(page['results']) for page in pages] == [5, 5, 2]
+        items = [item for page in pages for item in page['results']]
+        keys = [(-item['year'], item['id']) for item in items]
+        assert keys == sorted(keys) and len(set(keys)) == 12, (
+            'Проверьте, что пагинация по курсору выдаёт произведения '
+            'в порядке (-year, id) без пропусков и повторов'
+        )
+        assert pages[0]['previous'] is None
+        response = client.get(pages[2]['previous'])
+        assert response.json()['results'] == pages[1]['results'], (
+            'Проверьте, что ссылка `previous` возвращает предыдущую страницу'
+        )
+        response = client.get('/api/v1/titles/?cursor=broken')
+        assert response.status_code == 404
+        for values in (['abc', 1], [None, 1], [[2000], 1], [2000, {}]):
+            response = client.get('/api/v1/titles/', {
+                'cursor': cursor(values),
+            })
+            assert response.status_code == 404, (
+                f'Проверьте, что курсор со значениями {values} '
+                'отклоняется с ошибкой 404'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_page_number_by_default(self, client):
+        response = client.get('/api/v1/titles/')
+        assert 'count' in response.json(), (
+            'Проверьте, что постраничная пагинация остаётся по умолчанию'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_reviews_cursor(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/?pagination=cursor'
+        response = client.get(url)
+        ids = [item['id'] for item in response.json()['results']]
+        assert sorted(ids) == sorted(review['id'] for review in reviews)
+        from api.v1.pagination import KeysetPagination
+        KeysetPagination.page_size, old_size = 1, KeysetPagination.page_size
+        try:
+            pages = self.collect(client, url)
+        finally:
+            KeysetPagination.page_size = old_size
+        assert [page['results'][0]['id'] for page in pages] == ids, (
+            'Проверьте, что пагинация по курсору выдаёт отзывы '
+            'в порядке (-pub_date, id) без пропусков и повторов'
+        )
+        for values in (['notadate', 1], [1, 1]):
+            response = client.get(url, {'cursor': cursor(values)})
+            assert response.status_code == 404, (
+                f'Проверьте, что курсор со значениями {values} '
+                'отклоняется с ошибкой 404'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_cursor_page_seeks(self, client):
+        from django.core.management import call_command
+        from django.db import connection
+
+        from api.v1.slowqueries import explain
+        from reviews.models import Title
+        call_command('generatedata', '--reviews', '300', '--titles', '30',
+                     '--users', '60', '--seed', '1')
+        title = Title.objects.order_by('-review_count').first()
+        pages = (
+            ('/api/v1/titles/', 'reviews_title', '(year<?)'),
+            (f'/api/v1/titles/{title.pk}/reviews/', 'reviews_review',
+             '(title_id=? AND pub_date<?)'),
+        )
+        for url, table, seek in pages:
+            url = client.get(url, {'pagination': 'cursor'}).json()['next']
+            captured = []
+
+            def capture(execute, sql, params, many, context):
+                captured.append((sql, params))
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(capture):
+                assert client.get(url).status_code == 200
+            plans = [explain(connection, sql, params)
+                     for sql, params in captured
+                     if f'FROM "{table}"' in sql and 'ORDER BY' in sql]
+            assert plans and seek in plans[0][0], (
+                f'Проверьте, что страница {url} начинает поиск по индексу '
+                f'с позиции курсора: {plans}'
+            )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_search_with_cursor(self, client):
+        response = client.get('/api/v1/titles/', {
+            'search': 'описание', 'pagination': 'cursor',
+        })
+        assert response.status_code == 400, (
+            'Проверьте, что поиск с сортировкой по релевантности '
+            'не сочетается с пагинацией по курсору'
+        )
@@ -0,0 +1,91 @@
+import pytest
+
+from .common import auth_client, create_titles, create_users_api
+
+
+class Test11ResponseCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_titles_cache_invalidation(self, client, admin_client,
+                                          django_assert_num_queries):
+        from api.v1.cache import response_cache
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS'
+        hits = response_cache.stats()['hits']
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert response['X-Cache'] == 'HIT', (
+            'Проверьте, что повторный GET запрос отдаётся из кэша'
+        )
+        assert response_cache.stats()['hits'] == hits + 1
+        assert response.json()['rating'] is None
+
+        user, _ = create_users_api(admin_client)
+        auth_client(user).post(f'{url}reviews/', data={'text': 'a', 'score': 8})
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS' and response.json()['rating'] == 8, (
+            'Проверьте, что создание отзыва сбрасывает кэш произведений'
+        )
+        admin_client.patch(url, data={'genre': [titles[1]['genre'][0]]})
+        response = client.get(url)
+        assert [genre['slug'] for genre in response.json()['genre']] == titles[1]['genre'], (
+            'Проверьте, что изменение жанров произведения сбрасывает кэш'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_categories_cache_invalidation(self, client, admin_client):
+        client.get('/api/v1/categories/')
+        admin_client.post('/api/v1/categories/', data={'name': 'Кино', 'slug': 'cinema'})
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 1, (
+            'Проверьте, что создание категории сбрасывает кэш категорий'
+        )
+        admin_client.delete('/api/v1/categories/cinema/')
+        response = client.get('/api/v1/categories/')
+        assert response.json()['count'] == 0
+
+    def test_03_lru_eviction(self):
+        from api.v1.cache import MISSING, LRUCacheBackend, ResponseCache
+        cache = ResponseCache(LRUCacheBackend(max_entries=2))
+        cache.set('a', 1)
+        cache.set('b', 2)
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+        assert cache.get('b') is MISSING
+        assert cache.get('c') == 3
+        assert cache.stats() == {'hits': 2, 'misses': 1, 'evictions': 1, 'size': 2}
+
+    def test_04_shared_generations_and_ttl(self):
+        from api.v1.cache import MISSING, LRUCacheBackend
+        worker, other = LRUCacheBackend(), LRUCacheBackend()
+        before = worker.get_generations(('reviews.Title',))
+        assert other.get_generations(('reviews.Title',)) == before
+        other.bump_generation('reviews.Title')
+        assert worker.get_generations(('reviews.Title',)) != before, (
+            'Проверьте, что поколения моделей хранятся в общем кэше Django'
+        )
+        expired = LRUCacheBackend(timeout=0)
+        expired.set('key', 1)
+        assert expired.get('key') is MISSING, (
+            'Проверьте, что у записей кэша ответов есть время жизни'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_bulk_updates_invalidate(self, client, admin_client):
+        from io import StringIO
+
+        from django.core.management import call_command
+        from reviews.models import Title
+        titles, _, _ = create_titles(admin_client)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        client.get(url)
+        Title.objects.filter(pk=titles[0]['id']).update(name='Новое', rating=3)
+        assert client.get(url)['X-Cache'] == 'HIT'
+        call_command('rebuildratings', stdout=StringIO())
+        response = client.get(url)
+        assert response['X-Cache'] == 'MISS', (
+            'Проверьте, что команды управления сбрасывают кэш ответов'
+        )
+        assert response.json()['name'] == 'Новое'
@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from .common import create_reviews
+
+
+class Test12ConditionalGet:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_reviews_not_modified(self, client, admin_client, admin,
+                                     django_assert_num_queries):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+        assert etag and last_modified, (
+            'Проверьте, что GET запрос `/api/v1/titles/{title_id}/reviews/` '
+            'возвращает заголовки `ETag` и `Last-Modified`'
+        )
+        with django_assert_num_queries(1):
+            response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304 and not response.content, (
+            'Проверьте, что при совпадении `If-None-Match` возвращается статус 304 без тела'
+        )
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304, (
+            'Проверьте, что при совпадении `If-Modified-Since` возвращается статус 304'
+        )
+        response = client.get(f'{url}?pagination=cursor', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+
+        admin_client.patch(f'{url}{reviews[0]["id"]}/', data={'text': 'новый'})
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200 and response['ETag'] != etag, (
+            'Проверьте, что изменение отзыва меняет `ETag` списка отзывов'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_out_of_process_changes(self, client, admin_client, admin):
+        from api.v1.cache import response_cache
+        from reviews.models import Review
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/reviews/'
+        response = client.get(url)
+        etag = response['ETag']
+        last_modified = response['Last-Modified']
+        # Изменение в другом процессе: сигналы здесь не срабатывают,
+        # а поколения после перезапуска получают новые значения.
+        Review.objects.filter(pk=reviews[0]['id']).update(
+            text='новый', updated_at=timezone.now() + timedelta(seconds=2)
+        )
+        response_cache.clear()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что `ETag` зависит от данных, а не только '
+            'от счётчиков в памяти процесса'
+        )
+        response = client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 200, (
+            'Проверьте, что изменение отзыва меняет `Last-Modified`'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_titles_not_modified(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        url = f'/api/v1/titles/{titles[0]["id"]}/'
+        etag = client.get(url)['ETag']
+        assert client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        admin_client.delete(
+            f'/api/v1/titles/{titles[0]["id"]}/reviews/{reviews[0]["id"]}/'
+        )
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200, (
+            'Проверьте, что удаление отзыва меняет `ETag` произведения'
+        )
+        etag = client.get('/api/v1/categories/')['ETag']
+        response = client.get('/api/v1/categories/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_missing_objects(self, client, admin_client, admin):
+        reviews, titles, _, _ = create_reviews(admin_client, admin)
+        title_id = titles[0]['id']
+        other_id = titles[1]['id']
+        review_id = reviews[0]['id']
+        empty = admin_client.post('/api/v1/titles/', data={
+            'name': 'Без отзывов', 'year': 2000,
+            'genre': titles[0]['genre'], 'category': titles[0]['category'],
+        }).json()['id']
+        urls = (
+            '/api/v1/titles/99999999/',
+            '/api/v1/titles/99999999/reviews/',
+            f'/api/v1/titles/{title_id}/reviews/99999999/',
+            f'/api/v1/titles/{title_id}/reviews/99999999/comments/',
+            f'/api/v1/titles/{other_id}/reviews/{review_id}/comments/',
+        )
+        for url in urls:
+            response = client.get(url, HTTP_IF_NONE_MATCH='*')
+            assert response.status_code == 404, (
+                f'Проверьте, что условный GET `{url}` несуществующего '
+                'объекта возвращает 404, а не 304'
+            )
+        response = client.get(f'/api/v1/titles/{empty}/reviews/',
+                              HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 304, (
+            'Проверьте, что пустая коллекция существующего произведения '
+            'отвечает на условный запрос как обычно'
+        )
@@ -0,0 +1,78 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test13TitleSearch:
+
+    def names(self, client, query):
+        response = client.get(f'/api/v1/titles/?{query}')
+        assert response.status_code == 200, (
+            f'Проверьте, что GET запрос `/api/v1/titles/?{query}` возвращает статус 200'
+        )
+        return [title['name'] for title in response.json()['results']]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_search(self, client, admin_client):
+        from reviews.search import search_index_available
+        assert search_index_available(), (
+            'Проверьте, что миграции создают полнотекстовый индекс произведений'
+        )
+        titles, _, _ = create_titles(admin_client)
+        admin_client.post('/api/v1/titles/', data={
+            'name': 'Драма', 'year': 1990, 'genre': titles[1]['genre'],
+            'category': titles[1]['category'], 'description': 'Просто драма',
+        })
+        assert self.names(client, 'search=драма') == ['Драма', 'Проект'], (
+            'Проверьте, что `search` ищет по названию и описанию '
+            'и сортирует результаты по релевантности'
+        )
+        assert self.names(client, 'search=главная драма') == ['Проект']
+        assert self.names(client, 'search=пике"') == []
+        assert self.names(client, 'search=ПИКЕ') == ['Поворот туда']
+
+        admin_client.patch(f'/api/v1/titles/{titles[0]["id"]}/', data={'name': 'Разворот'})
+        assert self.names(client, 'search=поворот') == []
+        assert self.names(client, 'search=разворот') == ['Разворот'], (
+            'Проверьте, что индекс обновляется при изменении произведения'
+        )
+        admin_client.delete(f'/api/v1/titles/{titles[0]["id"]}/')
+        assert self.names(client, 'search=пике') == []
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_name_filter(self, client, admin_client):
+        create_titles(admin_client)
+        assert self.names(client, 'name=ворот') == ['Поворот туда'], (
+            'Проверьте, что фильтр `name` ищет подстроку в названии'
+        )
+        assert self.names(client, 'name=пике') == [], (
+            'Проверьте, что фильтр `name` не ищет по описанию'
+        )
+        assert self.names(client, 'name=ро') == ['Проект', 'Поворот туда']
+        assert self.names(client, 'name=про&search=драма') == ['Проект']
+
+    @pytest.mark.django_db
+    def test_03_migration_without_trigram(self):
+        from importlib import import_module
+
+        from django.db import OperationalError
+        migration = import_module(
+            'reviews.migrations.0005_title_search_index'
+        )
+        executed = []
+
+        class SchemaEditor:
+            class connection:
+                vendor = 'sqlite'
+                alias = 'default'
+
+            def execute(self, sql):
+                if 'trigram' in sql:
+                    raise OperationalError('no such tokenizer: trigram')
+                executed.append(sql)
+
+        migration.create_index(None, SchemaEditor())
+        assert executed == [], (
+            'Проверьте, что без токенизатора trigram миграция не создаёт '
+            'полнотекстовый индекс'
+        )
@@ -0,0 +1,146 @@
+import os
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+
+class Test14FillDatabase:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_filldatabase(self):
+        from reviews.models import Comment, Review, Title
+        from users.models import CustomUser
+        call_command('filldatabase', '--batch-size', '10')
+        assert CustomUser.objects.count() == 5
+        assert Title.objects.count() == 32
+        assert Title.genre.through.objects.count() == 42
+        assert Review.objects.count() == 72
+        assert Comment.objects.count() == 3
+        title = Title.objects.get(pk=1)
+        assert (title.review_count, title.rating) == (2, 10), (
+            'Проверьте, что после загрузки пересчитываются рейтинги произведений'
+        )
+        assert Review.objects.get(pk=1).pub_date.year == 2019
+        with pytest.raises(CommandError):
+            call_command('filldatabase')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_filldatabase_workers(self, monkeypatch):
+        from filldb.management.commands import filldatabase
+        from reviews.models import Comment, Title
+        completed = []
+        wait = filldatabase.wait
+
+        def recording_wait(futures, **kwargs):
+            done, not_done = wait(futures, **kwargs)
+            completed.extend(done)
+            return done, not_done
+
+        monkeypatch.setattr(filldatabase, 'wait', recording_wait)
+        call_command('filldatabase', '--workers', '3', '--batch-size', '5000')
+        assert len(completed) == len(set(completed)) == len(filldatabase.TABLES), (
+            'Проверьте, что результат разбора каждой таблицы забирается '
+            'из пула один раз'
+        )
+        assert Title.genre.through.objects.count() == 42
+        assert Comment.objects.count() == 3
+        assert Title.objects.get(pk=1).rating == 10
+
+    def test_03_table_dependencies(self):
+        from filldb.management.commands.filldatabase import (
+            TABLES, table_dependencies)
+        names = [table.filename for table in TABLES]
+        graph = {
+            names[index]: {names[dep] for dep in deps}
+            for index, deps in table_dependencies().items()
+        }
+        assert graph['users.csv'] == graph['category.csv'] == graph['genre.csv'] == set()
+        assert graph['genre_title.csv'] == {'titles.csv', 'genre.csv'}
+        assert graph['comments.csv'] == {'review.csv', 'users.csv'}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_filldatabase_upsert(self, tmp_path, monkeypatch):
+        import csv
+        import shutil
+
+        from filldb.management.commands import filldatabase
+        from filldb.models import ImportedRow
+        from reviews.models import Comment, Review, Title
+        for filename in os.listdir(filldatabase.CSV_DIR):
+            shutil.copy(os.path.join(filldatabase.CSV_DIR, filename), tmp_path)
+        monkeypatch.setattr(filldatabase, 'CSV_DIR', str(tmp_path))
+        call_command('filldatabase', '--upsert')
+        assert Review.objects.count() == 72
+        assert Title.objects.get(pk=1).rating == 10
+
+        def rewrite(filename, change):
+            path = tmp_path / filename
+            with open(path, encoding='utf-8', newline='') as f:
+                rows = list(csv.reader(f))
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                csv.writer(f).writerows(change(rows))
+
+        def change_score(rows):
+            rows[1][4] = '1'
+            return rows
+
+        rewrite('review.csv', change_score)
+        rewrite('comments.csv', lambda rows: rows[:-1])
+        rewrite('titles.csv', lambda rows: rows + [['1000', 'Новинка', '2020', '1']])
+        Title.objects.filter(pk=2).update(name='Изменено не из csv')
+
+        diffs = filldatabase.upsert(
+            {model: set(model.objects.values_list('pk', flat=True))
+             for model in (table.model for table in filldatabase.TABLES)},
+            100,
+        )
+        changes = {diff.table.filename: (len(diff.created), len(diff.updated), len(diff.deleted))
+                   for diff in diffs}
+        assert changes == {
+            'users.csv': (0, 0, 0), 'category.csv': (0, 0, 0), 'genre.csv': (0, 0, 0),
+            'titles.csv': (1, 0, 0), 'genre_title.csv': (0, 0, 0),
+            'review.csv': (0, 1, 0), 'comments.csv': (0, 0, 1),
+        }, 'Проверьте, что --upsert изменяет только изменившиеся строки'
+        assert Comment.objects.count() == 2
+        assert Title.objects.get(pk=1000).name == 'Новинка'
+        assert Title.objects.get(pk=2).name == 'Изменено не из csv'
+        title = Title.objects.get(pk=Review.objects.get(pk=1).title_id)
+        assert (title.rating_sum, title.review_count) == (11, 2)
+
+        def move_review(rows):
+            rows[1][1] = '2'
+            return rows
+
+        target = Title.objects.get(pk=2)
+        rewrite('review.csv', move_review)
+        rewrite('titles.csv', lambda rows: rows[:-1])
+        Title.objects.filter(pk=1000).delete()
+        filldatabase.upsert(
+            {model: set(model.objects.values_list('pk', flat=True))
+             for model in (table.model for table in filldatabase.TABLES)},
+            100,
+        )
+        title.refresh_from_db()
+        assert (title.rating_sum, title.review_count) == (10, 1), (
+            'Проверьте, что при переносе отзыва пересчитывается рейтинг '
+            'прежнего произведения'
+        )
+        moved = Title.objects.get(pk=2)
+        assert (moved.rating_sum, moved.review_count) == (
+            target.rating_sum + 1, target.review_count + 1
+        )
+        assert not ImportedRow.objects.filter(
+            table='titles.csv', row_id=1000
+        ).exists(), (
+            'Проверьте, что записи манифеста об удалённых строках удаляются'
+        )
+        Comment.objects.first().delete()
+        filldatabase.upsert(
+            {model: set(model.objects.values_list('pk', flat=True))
+             for model in (table.model for table in filldatabase.TABLES)},
+            100,
+        )
+        assert Comment.objects.count() == 2, (
+            'Проверьте, что строка csv, удалённая из базы, добавляется снова'
+        )
@@ -0,0 +1,54 @@
+import csv
+import gzip
+import json
+import os
+
+import pytest
+from django.core.management import call_command
+
+from .common import create_titles
+
+
+def read_csv(path, opener=open):
+    with opener(path, 'rt', encoding='utf-8', newline='') as f:
+        header, *rows = csv.reader(f)
+    return header, sorted(rows, key=lambda row: int(row[0]))
+
+
+class Test15Export:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_exportdatabase(self, tmp_path):
+        from filldb.management.commands.filldatabase import CSV_DIR
+        call_command('filldatabase')
+        call_command('exportdatabase', str(tmp_path), '--chunk-size', '7')
+        for filename in os.listdir(CSV_DIR):
+            assert read_csv(tmp_path / filename) == read_csv(os.path.join(CSV_DIR, filename)), (
+                f'Проверьте, что `exportdatabase` выгружает `{filename}` в формате filldatabase'
+            )
+        call_command('exportdatabase', str(tmp_path), '--gzip')
+        assert read_csv(tmp_path / 'review.csv.gz', gzip.open) == read_csv(
+            os.path.join(CSV_DIR, 'review.csv')
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_export_titles_endpoint(self, client, user_client, admin_client):
+        url = '/api/v1/export/titles.ndjson'
+        assert client.get(url).status_code == 401
+        assert user_client.get(url).status_code == 403, (
+            f'Проверьте, что `{url}` доступен только администратору'
+        )
+        titles, _, _ = create_titles(admin_client)
+        response = admin_client.get(url)
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('application/x-ndjson')
+        body = b''.join(response.streaming_content).decode('utf-8')
+        records = [json.loads(line) for line in body.splitlines()]
+        assert [record['id'] for record in records] == sorted(title['id'] for title in titles)
+        assert records[0]['genre'] == sorted(titles[0]['genre'])
+        assert records[0]['category'] == titles[0]['category']
+
+        response = admin_client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        body = gzip.decompress(b''.join(response.streaming_content))
+        assert len(body.decode('utf-8').splitlines()) == len(titles)
@@ -0,0 +1,52 @@
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+
+class Test16GenerateData:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_generatedata(self):
+        from reviews.models import Comment, Review, Title
+        from reviews.rating import review_aggregates
+        from users.models import CustomUser
+        args = ('--reviews', '300', '--titles', '20', '--users', '50',
+                '--batch-size', '700')
+        call_command('generatedata', *args, '--seed', '1')
+        assert CustomUser.objects.count() == 50
+        assert Title.objects.count() == 20
+        assert Review.objects.count() == 300
+        assert not Title.objects.filter(genre=None).exists(), (
+            'Проверьте, что у каждого произведения есть жанр'
+        )
+        counts = sorted(Title.objects.values_list('review_count', flat=True))
+        assert counts[-1] > 3 * counts[len(counts) // 2], (
+            'Проверьте, что отзывы распределены по закону Ципфа'
+        )
+        for title in review_aggregates(Title.objects.all()):
+            assert (title.review_count, title.rating_sum) == (
+                title.actual_count, title.actual_sum or 0
+            ), 'Проверьте, что после генерации пересчитываются рейтинги'
+        first = list(Review.objects.order_by('pk').values_list(
+            'title', 'author', 'score'
+        ))
+        comments = Comment.objects.count()
+
+        call_command('generatedata', *args, '--seed', '1')
+        assert Review.objects.count() == 600
+        assert Comment.objects.count() == 2 * comments
+        second = list(
+            Review.objects.order_by('pk')[300:].values_list(
+                'title', 'author', 'score'
+            )
+        )
+        assert [(title - 20, author - 50, score)
+                for title, author, score in second] == first, (
+            'Проверьте, что одно зерно даёт один и тот же набор данных'
+        )
+
+    @pytest.mark.django_db
+    def test_02_generatedata_too_many_reviews(self):
+        with pytest.raises(CommandError):
+            call_command('generatedata', '--reviews', '100', '--titles', '2',
+                         '--users', '10')
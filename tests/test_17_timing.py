@@ -0,0 +1,122 @@
+import re
+
+import pytest
+
+
+class Test17ServerTiming:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_server_timing_header(self, client, admin_client):
+        from api.v1.metrics import request_stats
+        from tests.common import create_titles
+        create_titles(admin_client)
+        request_stats.clear()
+        response = client.get('/api/v1/titles/')
+        header = response.get('Server-Timing')
+        assert header, 'Проверьте, что ответ содержит заголовок Server-Timing'
+        assert 'view;desc="TitleViewSet.list"' in header
+        metrics = dict(re.findall(r'(\w+);dur=([\d.]+)', header))
+        assert set(metrics) == {'db', 'serialize', 'render', 'total'}
+        assert float(metrics['total']) >= float(metrics['db'])
+        queries = int(re.search(r'db;dur=[\d.]+;desc="(\d+) queries"',
+                                header).group(1))
+        assert queries > 0, (
+            'Проверьте, что заголовок содержит число запросов к базе'
+        )
+        key = ('titles', 'TitleViewSet.list')
+        histograms = request_stats.histograms()
+        for phase in ('db', 'serialize', 'render', 'total'):
+            histogram = histograms[key + (phase,)]
+            assert histogram.count == 1
+            assert histogram.cumulative()[-1] == (float('inf'), 1)
+        assert request_stats.queries()[key] == queries
+        assert request_stats.sizes()[key].sum == len(response.content)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_server_timing_routes(self, client):
+        from api.v1.metrics import request_stats
+        request_stats.clear()
+        client.post('/api/v1/auth/signup/', data={
+            'username': 'timing', 'email': 'timing@yamdb.fake'
+        })
+        client.get('/api/v1/titles/1/')
+        client.get('/api/v1/titles/1/reviews/2/comments/')
+        client.get('/api/v1/titles.json')
+        client.get('/api/v1/unknown/')
+        assert set(request_stats.requests()) == {
+            ('auth/signup', 'signup', '200'),
+            ('titles/{pk}', 'TitleViewSet.retrieve', '404'),
+            ('titles/{title_id}/reviews/{review_id}/comments',
+             'CommentViewSet.list', '404'),
+            ('titles', 'TitleViewSet.list', '200'),
+            ('unresolved', 'unresolved', '404'),
+        }, 'Проверьте, что метки маршрутов строятся по шаблонам v1_router'
+        assert request_stats.events() == {'signups': 1}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_metrics_endpoint(self, client, admin_client, user_client):
+        from api.v1.cache import response_cache
+        from api.v1.metrics import request_stats
+        request_stats.clear()
+        response_cache.clear()
+        assert client.get('/api/v1/metrics').status_code == 401
+        assert user_client.get('/api/v1/metrics').status_code == 403
+        client.get('/api/v1/genres/')
+        client.get('/api/v1/genres/')
+        response = admin_client.get('/api/v1/metrics')
+        assert response.status_code == 200
+        assert response['Content-Type'].startswith('text/plain; version=0.0.4')
+        text = response.content.decode()
+        assert ('yamdb_requests_total{route="genres",'
+                'view="GenreViewSet.list",status="200"} 2') in text
+        assert ('yamdb_request_duration_seconds_bucket{route="genres",'
+                'view="GenreViewSet.list",phase="total",le="+Inf"} 2') in text
+        assert 'yamdb_response_size_bytes_count{route="genres",' in text
+        assert 'yamdb_db_queries_total{route="genres",' in text
+        assert 'yamdb_response_cache_hit_ratio 0.5' in text
+        assert 'yamdb_signups_total 0' in text
+        assert 'yamdb_tokens_issued_total 0' in text
+
+    def test_04_request_stats_threads(self):
+        import threading
+
+        from api.v1.metrics import RequestStats
+        from api.v1.timing import Timings
+        stats = RequestStats()
+        timings = Timings()
+        timings.route, timings.view, timings.status = 'titles', 'list', 200
+
+        def worker():
+            for _ in range(1000):
+                stats.observe(timings)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert stats.requests() == {('titles', 'list', '200'): 8000}
+        assert stats.histograms()[('titles', 'list', 'total')].count == 8000
+
+        # Поток на запрос, как у runserver: полос не становится больше.
+        for _ in range(100):
+            thread = threading.Thread(target=stats.observe, args=(timings,))
+            thread.start()
+            thread.join()
+        assert len(stats._shards) == 16, (
+            'Проверьте, что число полос метрик не растёт с числом потоков'
+        )
+        assert stats.requests() == {('titles', 'list', '200'): 8100}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_server_timing_only_for_admins(self, client, admin_client,
+                                              user_client, settings):
+        settings.SERVER_TIMING_HEADER = False
+        assert 'Server-Timing' not in client.get('/api/v1/titles/'), (
+            'Проверьте, что без SERVER_TIMING_HEADER анонимные клиенты '
+            'не получают заголовок Server-Timing'
+        )
+        assert 'Server-Timing' not in user_client.get('/api/v1/titles/')
+        assert 'Server-Timing' in admin_client.get('/api/v1/titles/'), (
+            'Проверьте, что администратор получает заголовок Server-Timing'
+        )
@@ -0,0 +1,78 @@
+import threading
+
+import pytest
+
+
+class Test18Profiling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_profiling_admin_only(self, client, user_client):
+        assert client.get('/api/v1/profiling').status_code == 401
+        assert user_client.post('/api/v1/profiling').status_code == 403
+        assert user_client.get('/api/v1/profiling/stacks').status_code == 403
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_profiling_route_sampling(self, client, admin_client):
+        from api.v1.profiling import profiler
+        response = admin_client.post('/api/v1/profiling', data={
+            'route': 'titles*', 'rate': 1, 'duration': 60
+        })
+        try:
+            assert response.status_code == 200
+            assert response.json()['enabled'] is True
+            client.get('/api/v1/titles/')
+            client.get('/api/v1/titles/1/reviews/')
+            client.get('/api/v1/genres/')
+            assert profiler.requests == 2, (
+                'Проверьте, что профилируются только запросы к маршрутам, '
+                'подходящим под шаблон'
+            )
+            assert not profiler._threads
+            response = admin_client.post('/api/v1/profiling', data={
+                'route': 'titles*', 'rate': 0
+            })
+            client.get('/api/v1/titles/')
+            assert profiler.requests == 0
+            response = admin_client.post('/api/v1/profiling',
+                                         data={'rate': 2})
+            assert response.status_code == 400
+        finally:
+            response = admin_client.delete('/api/v1/profiling')
+        assert response.json()['enabled'] is False
+        client.get('/api/v1/titles/')
+        assert profiler.requests == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_profiling_stacks(self, admin_client):
+        from api.v1.profiling import profiler
+        profiler.start(duration=60)
+        profiler.stop()
+        profiler._sampler.join()
+        started, stopped = threading.Event(), threading.Event()
+
+        def busy():
+            profiler.begin()
+            started.set()
+            while not stopped.is_set():
+                sum(range(1000))
+            profiler.end()
+
+        thread = threading.Thread(target=busy)
+        thread.start()
+        started.wait()
+        try:
+            for _ in range(5):
+                profiler.sample()
+        finally:
+            stopped.set()
+            thread.join()
+        response = admin_client.get('/api/v1/profiling/stacks')
+        assert response.status_code == 200
+        assert 'attachment' in response['Content-Disposition']
+        lines = response.content.decode().splitlines()
+        assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == 5
+        stack = lines[0].rsplit(' ', 1)[0].split(';')
+        assert stack[-1].startswith('busy (')
+        assert 'run (' in stack[-2], (
+            'Проверьте, что стеки идут от корня к вершине'
+        )
@@ -0,0 +1,68 @@
+import json
+import logging
+
+import pytest
+
+
+class Test19SlowQueries:
+
+    def test_01_redact(self):
+        from api.v1.slowqueries import redact
+        assert redact(
+            'SELECT "t"."id" FROM "reviews_title" "t" '
+            "WHERE \"t\".\"year\" = %s AND \"t\".\"name\" = 'It''s' LIMIT 21"
+        ) == ('SELECT "t"."id" FROM "reviews_title" "t" '
+              'WHERE "t"."year" = ? AND "t"."name" = ? LIMIT ?')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_slow_query_log(self, client, admin_client, settings, caplog):
+        from tests.common import create_titles
+        create_titles(admin_client)
+        settings.SLOW_QUERY_LOG = {'THRESHOLD_MS': 0, 'FILENAME': None}
+        with caplog.at_level(logging.WARNING, logger='api.slow_queries'):
+            client.get('/api/v1/titles/', {'year': 1975})
+        entries = [json.loads(record.getMessage())
+                   for record in caplog.records
+                   if record.name == 'api.slow_queries']
+        assert entries, 'Проверьте, что медленные запросы попадают в журнал'
+        for entry in entries:
+            assert entry['view'] == 'TitleViewSet.list'
+            assert entry['route'] == 'titles'
+            assert '1975' not in entry['sql'], (
+                'Проверьте, что параметры запроса скрыты'
+            )
+        selects = [entry for entry in entries
+                   if entry['sql'].startswith('SELECT')]
+        assert selects and all(entry['plan'] for entry in selects), (
+            'Проверьте, что для SELECT сохраняется план EXPLAIN'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_threshold(self, client, settings, caplog):
+        settings.SLOW_QUERY_LOG = {'THRESHOLD_MS': 60_000, 'FILENAME': None}
+        with caplog.at_level(logging.WARNING, logger='api.slow_queries'):
+            client.get('/api/v1/titles/')
+        assert not [record for record in caplog.records
+                    if record.name == 'api.slow_queries']
+
+    def test_04_rotating_file(self, tmp_path):
+        from api.v1.slowqueries import (DEFAULTS, logger, start_file_listener,
+                                        stop_file_listener)
+        filename = tmp_path / 'logs' / 'slow.log'
+        stop_file_listener()
+        start_file_listener({**DEFAULTS, 'FILENAME': str(filename)})
+        try:
+            logger.warning('{"sql": "SELECT ?"}')
+        finally:
+            stop_file_listener()
+        assert filename.read_text(encoding='utf-8') == '{"sql": "SELECT ?"}\n'
+
+    def test_05_full_scan(self):
+        from api.v1.slowqueries import full_scan
+        assert full_scan(['SCAN reviews_title'])
+        assert not full_scan(['SCAN reviews_title_fts VIRTUAL TABLE INDEX '
+                              '0:M2'])
+        assert not full_scan(['SCAN reviews_title USING INDEX '
+                              'title_year_id_idx'])
+        assert not full_scan(['SEARCH reviews_review USING INDEX '
+                              'review_title_pub_date_idx (title_id=?)'])
@@ -0,0 +1,139 @@
+import re
+
+import pytest
+from django.core.management import call_command
+
+from .common import LARGE_TABLES, scanned_tables
+
+# Число объектов всей коллекции для постраничной пагинации требует
+# полного просмотра; ?pagination=cursor обходится без него.
+PAGE_COUNT = re.compile(r'^SELECT COUNT\(\*\) AS "__count" FROM "\w+"$')
+
+
+class Test20QueryPlans:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_viewset_query_plans(self, admin_client):
+        from django.db import connection
+
+        from api.v1.cache import response_cache
+        from api.v1.slowqueries import explain
+        from reviews.models import Category, Comment, Genre, Review, Title
+        from tests.common import auth_client
+        from users.models import CustomUser
+        call_command('generatedata', '--reviews', '300', '--titles', '30',
+                     '--users', '60', '--seed', '1')
+        title = Title.objects.order_by('-review_count').first()
+        review = Comment.objects.first().review
+        user = CustomUser.objects.exclude(reviews__title=title).first()
+        category = Category.objects.first().slug
+        genre = Genre.objects.first().slug
+        genres = ','.join(title.genre.values_list('slug', flat=True)[:2])
+        categories = ','.join(
+            Category.objects.values_list('slug', flat=True)[:2]
+        )
+        reviews = f'/api/v1/titles/{title.pk}/reviews/'
+        comments = (f'/api/v1/titles/{review.title_id}/reviews/'
+                    f'{review.pk}/comments/')
+        requests = [
+            ('get', '/api/v1/titles/', {}),
+            ('get', '/api/v1/titles/', {'genre': genre}),
+            ('get', '/api/v1/titles/', {'category': category}),
+            ('get', '/api/v1/titles/', {'category': category,
+                                        'genre': genre}),
+            ('get', '/api/v1/titles/', {'year': title.year}),
+            ('get', '/api/v1/titles/', {'genre': genres}),
+            ('get', '/api/v1/titles/', {'genre': genres,
+                                        'genre_match': 'all'}),
+            ('get', '/api/v1/titles/', {'category__in': categories,
+                                        'year_min': title.year - 5,
+                                        'year_max': title.year + 5,
+                                        'rating_min': 5}),
+            ('get', '/api/v1/titles/', {'rating_min': 5}),
+            ('get', '/api/v1/titles/', {'name': 'Произведение 1'}),
+            ('get', '/api/v1/titles/', {'search': 'описание'}),
+            ('get', '/api/v1/titles/', {'pagination': 'cursor'}),
+            ('get', f'/api/v1/titles/{title.pk}/', {}),
+            ('get', reviews, {}),
+            ('get', reviews, {'pagination': 'cursor'}),
+            ('get', f'{reviews}{Review.objects.filter(title=title).first().pk}/',
+             {}),
+            ('get', comments, {}),
+            ('get', f'{comments}{review.comments.first().pk}/', {}),
+            ('get', '/api/v1/categories/', {}),
+            ('get', '/api/v1/genres/', {}),
+            ('get', '/api/v1/users/', {}),
+            ('get', f'/api/v1/users/{user.username}/', {}),
+        ]
+        captured = []
+
+        def capture(execute, sql, params, many, context):
+            if not many:
+                captured.append((sql, params))
+            return execute(sql, params, many, context)
+
+        failures = []
+        with connection.execute_wrapper(capture):
+            for method, url, params in requests:
+                response_cache.clear()
+                captured.clear()
+                response = getattr(admin_client, method)(url, params)
+                assert response.status_code == 200, url
+                for sql, sql_params in list(captured):
+                    if PAGE_COUNT.match(sql):
+                        continue
+                    tables = scanned_tables(
+                        explain(connection, sql, sql_params), sql
+                    ) & LARGE_TABLES
+                    if tables:
+                        failures.append(f'{url} {params}: {tables}\n{sql}')
+            captured.clear()
+            client = auth_client(user)
+            response = client.post(reviews, data={'text': 'Отзыв',
+                                                  'score': 5})
+            assert response.status_code == 201
+            for sql, sql_params in list(captured):
+                tables = scanned_tables(
+                    explain(connection, sql, sql_params), sql
+                ) & LARGE_TABLES
+                if tables:
+                    failures.append(f'POST {reviews}: {tables}\n{sql}')
+        assert not failures, (
+            'Полный просмотр больших таблиц в планах запросов:\n'
+            + '\n\n'.join(failures)
+        )
+
+    def test_02_scanned_tables(self):
+        assert scanned_tables(['SCAN TABLE reviews_review']) == {
+            'reviews_review'
+        }
+        assert scanned_tables(['SCAN reviews_title']) == {'reviews_title'}
+        assert scanned_tables([
+            'SCAN reviews_title USING INDEX title_year_id_idx',
+            'SEARCH reviews_review USING INDEX review_title_pub_date_idx '
+            '(title_id=?)',
+        ], 'SELECT * FROM reviews_title WHERE rating >= %s '
+           'ORDER BY year DESC LIMIT 5') == {'reviews_title'}, (
+            'Проверьте, что обход всего индекса считается полным просмотром'
+        )
+        assert scanned_tables([
+            'SCAN reviews_comment USING COVERING INDEX comment_idx',
+        ]) == {'reviews_comment'}
+        assert not scanned_tables([
+            'SCAN reviews_title USING INDEX title_year_id_idx',
+        ], 'SELECT * FROM reviews_title ORDER BY year DESC LIMIT 5')
+        assert not scanned_tables([
+            'SEARCH reviews_title USING INDEX title_year_id_idx (year<?)',
+        ])
+        assert not scanned_tables(['SCAN users_customuser'],
+                                  'SELECT * FROM users_customuser '
+                                  'ORDER BY id LIMIT 5')
+        assert scanned_tables(['SCAN users_customuser'],
+                              'SELECT * FROM users_customuser '
+                              'WHERE bio LIKE %s ORDER BY id LIMIT 5') == {
+            'users_customuser'
+        }, 'Проверьте, что просмотр с условием и LIMIT считается полным'
+        assert scanned_tables(['SCAN users_customuser',
+                               'USE TEMP B-TREE FOR ORDER BY'],
+                              'SELECT * FROM users_customuser '
+                              'ORDER BY email LIMIT 5')
@@ -0,0 +1,54 @@
+import pytest
+
+from .common import auth_client
+
+
+class Test21AuthUserCache:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_cached_user_lookup(self, user):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        client = auth_client(user)
+        # Условные запросы, чтобы валидатор ETag считался оба раза.
+        with CaptureQueriesContext(connection) as first:
+            client.get('/api/v1/titles/1/reviews/', HTTP_IF_NONE_MATCH='"0"')
+        with CaptureQueriesContext(connection) as second:
+            client.get('/api/v1/titles/1/reviews/', HTTP_IF_NONE_MATCH='"0"')
+        assert 'users_customuser' in first[0]['sql']
+        assert len(second) == len(first) - 1 and not any(
+            'users_customuser' in query['sql'] for query in second
+        ), (
+            'Проверьте, что повторный запрос с токеном не загружает '
+            'пользователя из базы'
+        )
+        response = client.get('/api/v1/users/me/')
+        assert response.json()['bio'] == 'user bio', (
+            'Проверьте, что профиль пользователя содержит все поля'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_role_change_invalidates(self, admin_client, user):
+        client = auth_client(user)
+        assert client.get('/api/v1/users/').status_code == 403
+        response = admin_client.patch(f'/api/v1/users/{user.username}/',
+                                      data={'role': 'admin'})
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что смена роли сбрасывает кэш аутентификации'
+        )
+        response = client.patch('/api/v1/users/me/', data={'bio': 'новое'})
+        assert response.status_code == 200
+        assert response.json()['role'] == 'admin'
+        user.refresh_from_db()
+        assert (user.bio, user.email) == ('новое', 'testuser@yamdb.fake')
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_inactive_and_deleted_user(self, admin_client, user):
+        client = auth_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/users/me/').status_code == 401
+        admin_client.delete(f'/api/v1/users/{user.username}/')
+        assert client.get('/api/v1/users/me/').status_code == 401
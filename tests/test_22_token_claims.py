@@ -0,0 +1,82 @@
+import pytest
+from rest_framework.test import APIClient
+
+
+@pytest.fixture
+def claims_auth(settings):
+    settings.TOKEN_CLAIMS_AUTH = {**settings.TOKEN_CLAIMS_AUTH,
+                                  'ENABLED': True}
+
+
+def issue_token(user):
+    from django.contrib.auth.tokens import default_token_generator
+    response = APIClient().post('/api/v1/auth/token/', data={
+        'username': user.username,
+        'confirmation_code': default_token_generator.make_token(user),
+    })
+    assert response.status_code == 200
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Bearer {response.json()["token"]}')
+    return client, response.json()['token']
+
+
+class Test22TokenClaims:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_claims_without_user_query(self, claims_auth, admin):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from rest_framework_simplejwt.tokens import AccessToken
+        client, token = issue_token(admin)
+        claims = AccessToken(token)
+        assert (claims['role'], claims['ver']) == ('admin', 0), (
+            'Проверьте, что токен содержит роль и версию токенов'
+        )
+        assert client.get('/api/v1/users/').status_code == 200
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/v1/categories/')
+        assert response.status_code == 200
+        assert not any('users_customuser' in query['sql']
+                       for query in queries), (
+            'Проверьте, что повторная проверка токена не обращается к базе'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_role_change_rejects_token(self, claims_auth, admin_client,
+                                          user):
+        client, _token = issue_token(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        response = admin_client.patch(f'/api/v1/users/{user.username}/',
+                                      data={'role': 'moderator'})
+        assert response.status_code == 200
+        response = client.get('/api/v1/users/me/')
+        assert response.status_code == 401, (
+            'Проверьте, что после смены роли прежний токен отклоняется'
+        )
+        assert response.json()['code'] == 'token_stale'
+        user.refresh_from_db()
+        client, _token = issue_token(user)
+        assert client.get('/api/v1/users/me/').json()['role'] == 'moderator'
+        response = admin_client.patch(f'/api/v1/users/{user.username}/',
+                                      data={'bio': 'новое'})
+        assert response.status_code == 200
+        assert client.get('/api/v1/users/me/').status_code == 200, (
+            'Проверьте, что изменение других полей не отзывает токены'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_deactivated_user(self, claims_auth, admin_client, user):
+        from tests.common import auth_client
+        client, _token = issue_token(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        user.is_active = False
+        user.save()
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что токен деактивированного пользователя отклоняется'
+        )
+        user.is_active = True
+        user.save()
+        assert client.get('/api/v1/users/me/').status_code == 401
+        assert auth_client(user).get('/api/v1/users/me/').status_code == 200, (
+            'Проверьте, что токены без роли проверяются как раньше'
+        )
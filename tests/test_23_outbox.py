@@ -0,0 +1,135 @@
+import time
+
+import pytest
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+
+
+class FlakyBackend(EmailBackend):
+    """locmem-бэкенд, который считает соединения и не доставляет
+    письма на адреса fail@.
+    """
+    opened = 0
+
+    def open(self):
+        FlakyBackend.opened += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if any(to.startswith('fail@') for to in message.to):
+                raise ConnectionError('сервер недоступен')
+        return super().send_messages(messages)
+
+
+@pytest.fixture
+def outbox_settings(settings):
+    def configure(**options):
+        settings.EMAIL_OUTBOX = {**settings.EMAIL_OUTBOX, **options}
+    settings.EMAIL_BACKEND = 'tests.test_23_outbox.FlakyBackend'
+    FlakyBackend.opened = 0
+    return configure
+
+
+def signup(client, name):
+    response = client.post('/api/v1/auth/signup/', data={
+        'username': name, 'email': f'{name}@yamdb.fake',
+    })
+    assert response.status_code == 200
+
+
+class Test23Outbox:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_only_enqueues(self, client, outbox_settings):
+        from django.core.management import call_command
+        from outbox.models import OutgoingEmail
+        outbox_settings(WORKER='command')
+        sent_before = len(mail.outbox)
+        for name in ('first', 'second', 'third'):
+            signup(client, name)
+        assert len(mail.outbox) == sent_before, (
+            'Проверьте, что регистрация только ставит письмо в очередь'
+        )
+        assert OutgoingEmail.objects.filter(
+            status=OutgoingEmail.PENDING
+        ).count() == 3
+        call_command('sendoutbox')
+        assert len(mail.outbox) == sent_before + 3
+        assert FlakyBackend.opened == 1, (
+            'Проверьте, что пачка писем отправляется через одно соединение'
+        )
+        assert set(OutgoingEmail.objects.values_list('status', flat=True)) == {
+            OutgoingEmail.SENT
+        }
+        assert 'Ваш код подтверждения' in mail.outbox[-1].body
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_retry_with_backoff(self, client, outbox_settings):
+        from django.core.management import call_command
+        from django.utils import timezone
+        from outbox.models import OutgoingEmail
+        outbox_settings(WORKER='command', BACKOFF=60, MAX_ATTEMPTS=2)
+        signup(client, 'fail')
+        signup(client, 'good')
+        call_command('sendoutbox')
+        failed = OutgoingEmail.objects.get(to='fail@yamdb.fake')
+        assert (failed.status, failed.attempts) == (OutgoingEmail.PENDING, 1)
+        assert failed.last_error == 'сервер недоступен'
+        assert failed.next_attempt_at > timezone.now() + timezone.timedelta(
+            seconds=50
+        ), 'Проверьте, что повторная попытка откладывается'
+        assert OutgoingEmail.objects.get(
+            to='good@yamdb.fake'
+        ).status == OutgoingEmail.SENT
+        call_command('sendoutbox')
+        assert OutgoingEmail.objects.get(pk=failed.pk).attempts == 1
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        call_command('sendoutbox')
+        failed.refresh_from_db()
+        assert (failed.status, failed.attempts) == (OutgoingEmail.FAILED, 2), (
+            'Проверьте, что после MAX_ATTEMPTS попыток письмо не доставлено'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_thread_worker(self, client, outbox_settings):
+        from outbox.models import OutgoingEmail
+        outbox_settings(WORKER='thread')
+        signup(client, 'threaded')
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and OutgoingEmail.objects.filter(
+                status=OutgoingEmail.SENT).count() == 0:
+            time.sleep(0.02)
+        assert OutgoingEmail.objects.get().status == OutgoingEmail.SENT, (
+            'Проверьте, что фоновый поток отправляет письма из очереди'
+        )
+        assert mail.outbox[-1].to == ['threaded@yamdb.fake']
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_worker_starts_with_server(self, settings, outbox_settings):
+        from outbox.delivery import (autostart, outbox_config, worker,
+                                     worker_mode)
+        from outbox.models import OutgoingEmail
+        settings.EMAIL_BACKEND = (
+            'django.core.mail.backends.filebased.EmailBackend'
+        )
+        assert worker_mode(outbox_config()) == 'thread', (
+            'Проверьте, что по умолчанию письма отправляются не в запросе'
+        )
+        settings.EMAIL_BACKEND = 'tests.test_23_outbox.FlakyBackend'
+        outbox_settings(POLL_INTERVAL=0.05)
+        # Письмо, поставленное в очередь до перезапуска процесса
+        OutgoingEmail.objects.create(
+            subject='Код', body='Код', to='restart@yamdb.fake',
+            from_email='webmaster@localhost',
+        )
+        autostart()
+        assert worker.is_alive()
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline and OutgoingEmail.objects.filter(
+                status=OutgoingEmail.SENT).count() == 0:
+            time.sleep(0.02)
+        assert OutgoingEmail.objects.get().status == OutgoingEmail.SENT, (
+            'Проверьте, что фоновый поток отправляет письма, оставшиеся '
+            'в очереди до перезапуска'
+        )
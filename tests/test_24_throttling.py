@@ -0,0 +1,131 @@
+import pytest
+
+
+@pytest.fixture
+def throttle_rates(settings):
+    def configure(**rates):
+        settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK,
+                                   'DEFAULT_THROTTLE_RATES': rates}
+    return configure
+
+
+def signup(client, name, email=None):
+    return client.post('/api/v1/auth/signup/', data={
+        'username': name, 'email': email or f'{name}@yamdb.fake',
+    })
+
+
+class Test24Throttling:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_signup_limits(self, client, throttle_rates):
+        throttle_rates(signup_ip='4/min', signup_identity='2/min')
+        assert signup(client, 'first').status_code == 200
+        assert signup(client, 'first').status_code == 200
+        response = signup(client, 'first')
+        assert response.status_code == 429, (
+            'Проверьте, что повторные регистрации одного username '
+            'ограничены'
+        )
+        assert 25 <= int(response['Retry-After']) <= 30, (
+            'Проверьте, что ответ 429 содержит заголовок Retry-After'
+        )
+        response = signup(client, 'other', 'first@yamdb.fake')
+        assert response.status_code == 429, (
+            'Проверьте, что лимит действует и по email'
+        )
+        assert signup(client, 'second').status_code == 200, (
+            'Проверьте, что отклонённые запросы не тратят лимит IP-адреса'
+        )
+        assert signup(client, 'third').status_code == 200
+        assert signup(client, 'fourth').status_code == 429, (
+            'Проверьте, что запросы с одного IP-адреса ограничены'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_token_limits(self, client, throttle_rates, user):
+        throttle_rates(token_ip='100/min', token_identity='1/min')
+        data = {'username': user.username, 'confirmation_code': 'wrong'}
+        assert client.post('/api/v1/auth/token/', data=data).status_code == 400
+        response = client.post('/api/v1/auth/token/', data=data)
+        assert response.status_code == 429, (
+            'Проверьте, что подбор кода подтверждения ограничен'
+        )
+        assert signup(client, 'another').status_code == 200, (
+            'Проверьте, что лимиты регистрации и токена независимы'
+        )
+
+    def test_03_bucket_refill(self):
+        from api.v1.throttling import LocalBucketStore
+        now = [0.0]
+        store = LocalBucketStore(stripes=4, max_keys=8,
+                                 clock=lambda: now[0])
+        assert [store.take('key', 2, 1) for _ in range(3)] == [0, 0, 1]
+        now[0] += 0.5
+        assert store.take('key', 2, 1) == 0.5
+        now[0] += 0.5
+        assert store.take('key', 2, 1) == 0, (
+            'Проверьте, что корзина пополняется со временем'
+        )
+        for index in range(100):
+            store.take(f'other{index}', 2, 1)
+        assert sum(len(buckets) for buckets, _lock in store._stripes) <= 8, (
+            'Проверьте, что число корзин ограничено'
+        )
+
+    def test_04_cache_backend(self, settings):
+        from api.v1.throttling import CacheBucketStore, bucket_store
+        settings.THROTTLE_BUCKETS = {'BACKEND': 'cache'}
+        store = bucket_store()
+        assert isinstance(store, CacheBucketStore)
+        assert [store.take('cached', 1, 1) for _ in range(2)][1] > 0
+        store.clear()
+        assert store.take('cached', 1, 1) == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_forwarded_for_ignored(self, client, throttle_rates):
+        throttle_rates(signup_ip='2/min', signup_identity='5/min')
+        for index in range(2):
+            response = client.post('/api/v1/auth/signup/', data={
+                'username': f'spoof{index}',
+                'email': f'spoof{index}@yamdb.fake',
+            }, HTTP_X_FORWARDED_FOR=f'10.0.0.{index}')
+            assert response.status_code == 200
+        response = client.post('/api/v1/auth/signup/', data={
+            'username': 'spoof2', 'email': 'spoof2@yamdb.fake',
+        }, HTTP_X_FORWARDED_FOR='10.0.0.2')
+        assert response.status_code == 429, (
+            'Проверьте, что без NUM_PROXIES адрес клиента не берётся '
+            'из X-Forwarded-For'
+        )
+
+    def test_06_take_all_or_nothing(self):
+        from api.v1.throttling import LocalBucketStore
+        store = LocalBucketStore(stripes=4, clock=lambda: 0.0)
+        assert store.take('identity', 1, 1) == 0
+        assert store.take_all([('ip', 5, 1), ('identity', 1, 1)]) == 1
+        assert [store.take('ip', 5, 1) for _ in range(6)][-1] > 0, (
+            'Проверьте, что отклонённый запрос не берёт токен '
+            'из остальных корзин'
+        )
+
+    def test_07_evicts_least_recently_used(self):
+        from api.v1.throttling import LocalBucketStore
+        now = [0.0]
+        store = LocalBucketStore(stripes=1, max_keys=2,
+                                 clock=lambda: now[0])
+        assert store.take('busy', 2, 0.001) == 0
+        store.take('idle', 2, 0.001)
+        for _ in range(2):
+            now[0] += 1
+            store.take('busy', 2, 0.001)
+        store.take('new', 2, 0.001)
+        buckets, _lock = store._stripes[0]
+        assert set(buckets) == {'busy', 'new'}, (
+            'Проверьте, что вытесняется корзина, к которой дольше всех '
+            'не обращались'
+        )
+        assert store.take('busy', 2, 0.001) > 0, (
+            'Проверьте, что вытеснение не наполняет корзину активного '
+            'клиента заново'
+        )
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+from rest_framework.test import APIClient
+
+URL = '/api/v1/auth/signup/'
+THREADS = 8
+
+
+@pytest.fixture
+def no_throttling(settings):
+    settings.REST_FRAMEWORK = {**settings.REST_FRAMEWORK,
+                               'DEFAULT_THROTTLE_RATES': {}}
+
+
+def user_queries(queries):
+    return [query['sql'] for query in queries
+            if 'users_customuser' in query['sql']]
+
+
+class Test25Signup:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_single_user_query(self, client, no_throttling):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        data = {'username': 'single', 'email': 'single@yamdb.fake'}
+        with CaptureQueriesContext(connection) as created:
+            assert client.post(URL, data=data).json() == data
+        with CaptureQueriesContext(connection) as repeated:
+            response = client.post(URL, data={**data,
+                                              'email': 'Single@yamdb.fake'})
+        assert response.status_code == 200
+        assert len(user_queries(created)) == 2, (
+            'Проверьте, что регистрация нового пользователя выполняет '
+            'поиск и вставку'
+        )
+        assert len(user_queries(repeated)) == 1, (
+            'Проверьте, что повторная регистрация находит пользователя '
+            'одним запросом'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_conflicting_pairs(self, client, no_throttling):
+        for name in ('first', 'second'):
+            client.post(URL, data={'username': name,
+                                   'email': f'{name}@yamdb.fake'})
+        cases = (
+            ({'username': 'first', 'email': 'other@yamdb.fake'},
+             'Пользователь с таким именем уже есть'),
+            ({'username': 'other', 'email': 'first@yamdb.fake'},
+             'Пользователь с таким email уже зарегистрирован'),
+            ({'username': 'first', 'email': 'second@yamdb.fake'},
+             'Пользователь с таким именем уже есть'),
+        )
+        for data, message in cases:
+            response = client.post(URL, data=data)
+            assert response.status_code == 400, (
+                f'Проверьте, что регистрация {data} отклоняется'
+            )
+            assert response.json() == {'non_field_errors': [message]}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_parallel_duplicates(self, monkeypatch, no_throttling):
+        from django.db import connections
+        from api.v1.serializers import SignupSerializer
+        from users.models import CustomUser
+        data = {'username': 'racer', 'email': 'racer@yamdb.fake'}
+        find_user = SignupSerializer.find_user
+        barrier = threading.Barrier(THREADS)
+        # Тестовая база SQLite в памяти не допускает одновременной записи
+        # из разных соединений: все потоки вместе проходят поиск
+        # пользователя, а дальше выполняются по очереди.
+        writes = threading.Lock()
+        state = threading.local()
+        statuses = []
+
+        def racing_find_user(serializer, username, email):
+            user = find_user(serializer, username, email)
+            if not getattr(state, 'raced', False):
+                state.raced = True
+                barrier.wait(timeout=10)
+                writes.acquire()
+            return user
+
+        def post():
+            try:
+                statuses.append(APIClient().post(URL, data=data).status_code)
+            finally:
+                if getattr(state, 'raced', False):
+                    writes.release()
+                connections.close_all()
+
+        monkeypatch.setattr(SignupSerializer, 'find_user', racing_find_user)
+        threads = [threading.Thread(target=post) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert statuses == [200] * THREADS, (
+            'Проверьте, что одновременные одинаковые регистрации '
+            f'не приводят к ошибке: {statuses}'
+        )
+        assert CustomUser.objects.filter(username='racer').count() == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_conflict_without_user(self, client, monkeypatch,
+                                      no_throttling):
+        from api.v1.serializers import SignupSerializer
+        from users.models import CustomUser
+        CustomUser.objects.create(username='ghost', email='ghost@yamdb.fake')
+        # Конфликтующий пользователь не находится ни до вставки,
+        # ни после неё
+        monkeypatch.setattr(SignupSerializer, 'find_user',
+                            lambda serializer, username, email: None)
+        response = client.post(URL, data={'username': 'ghost',
+                                          'email': 'ghost@yamdb.fake'})
+        assert response.status_code == 400, (
+            'Проверьте, что конфликт вставки без найденного пользователя '
+            'не приводит к ошибке сервера'
+        )
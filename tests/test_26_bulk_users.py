@@ -0,0 +1,160 @@
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from .common import auth_client
+
+URL = '/api/v1/users/bulk/'
+
+
+def rows(count, prefix='bulk'):
+    return [{'username': f'{prefix}{index}',
+             'email': f'{prefix}{index}@yamdb.fake'}
+            for index in range(count)]
+
+
+class Test26BulkUsers:
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_bulk_create(self, admin_client):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from users.models import CustomUser
+        admin_client.get('/api/v1/users/me/')
+        with CaptureQueriesContext(connection) as small:
+            response = admin_client.post(f'{URL}create/', data=rows(2, 'a'),
+                                         format='json')
+        assert response.status_code == 201
+        with CaptureQueriesContext(connection) as large:
+            response = admin_client.post(
+                f'{URL}create/',
+                data=[{**row, 'role': 'moderator', 'bio': 'о себе'}
+                      for row in rows(30, 'b')],
+                format='json',
+            )
+        assert response.status_code == 201, response.json()
+        assert len(response.json()) == 30
+        assert response.json()[0] == {
+            'username': 'b0', 'email': 'b0@yamdb.fake', 'first_name': None,
+            'last_name': None, 'bio': 'о себе', 'role': 'moderator',
+        }
+        assert len(large) == len(small), (
+            'Проверьте, что число запросов к базе не зависит от числа строк'
+        )
+        assert CustomUser.objects.filter(role='moderator').count() == 30
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_row_errors(self, admin_client, user):
+        from users.models import CustomUser
+        count = CustomUser.objects.count()
+        response = admin_client.post(f'{URL}create/', data=[
+            {'username': 'fresh', 'email': 'fresh@yamdb.fake'},
+            {'username': 'fresh', 'email': 'other@yamdb.fake'},
+            {'username': 'another', 'email': user.email.upper()},
+            {'username': 'me', 'email': 'me@yamdb.fake', 'role': 'king'},
+        ], format='json')
+        assert response.status_code == 400
+        errors = response.json()
+        assert errors[0] == {}
+        assert list(errors[1]) == ['username']
+        assert list(errors[2]) == ['email'], (
+            'Проверьте, что занятый email находится без учёта регистра'
+        )
+        assert set(errors[3]) == {'username', 'role'}
+        assert CustomUser.objects.count() == count, (
+            'Проверьте, что при ошибках не создаётся ни один пользователь'
+        )
+        response = admin_client.post(f'{URL}create/', data={}, format='json')
+        assert response.status_code == 400
+
+    @pytest.mark.django_db(transaction=True)
+    def test_03_csv_upload(self, admin_client):
+        from users.models import CustomUser
+        content = ('username,email,role,bio\n'
+                   'csv1,csv1@yamdb.fake,moderator,\n'
+                   'csv2,csv2@yamdb.fake,,о себе\n').encode('utf-8-sig')
+        response = admin_client.post(f'{URL}create/', data={
+            'file': SimpleUploadedFile('users.csv', content, 'text/csv'),
+        }, format='multipart')
+        assert response.status_code == 201, response.json()
+        assert dict(CustomUser.objects.filter(
+            username__startswith='csv'
+        ).values_list('username', 'role')) == {'csv1': 'moderator',
+                                               'csv2': 'user'}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_04_bulk_role(self, admin_client, user_superuser, user,
+                          moderator):
+        client = auth_client(user)
+        assert client.get('/api/v1/users/').status_code == 403
+        response = admin_client.post(f'{URL}role/', data={
+            'usernames': [user.username, 'ghost', user_superuser.username],
+            'role': 'user',
+        }, format='json')
+        assert response.status_code == 400
+        assert response.json() == {'usernames': {
+            '1': ['Пользователь не найден'],
+            '2': ['Роль суперпользователя изменить нельзя'],
+        }}
+        response = admin_client.post(f'{URL}role/', data={
+            'usernames': [user.username, moderator.username],
+            'role': 'admin',
+        }, format='json')
+        assert response.json() == {'updated': 2}
+        assert client.get('/api/v1/users/').status_code == 200, (
+            'Проверьте, что массовая смена роли сбрасывает кэш '
+            'аутентификации'
+        )
+        user.refresh_from_db()
+        assert (user.role, user.token_version) == ('admin', 1)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_05_bulk_deactivate(self, admin_client, admin, user):
+        client = auth_client(user)
+        assert client.get('/api/v1/users/me/').status_code == 200
+        assert client.post(f'{URL}deactivate/', data={
+            'usernames': [user.username],
+        }, format='json').status_code == 403
+        response = admin_client.post(f'{URL}deactivate/', data={
+            'usernames': [admin.username],
+        }, format='json')
+        assert response.status_code == 400
+        response = admin_client.post(f'{URL}deactivate/', data={
+            'usernames': [user.username],
+        }, format='json')
+        assert response.json() == {'updated': 1}
+        assert client.get('/api/v1/users/me/').status_code == 401, (
+            'Проверьте, что деактивированный пользователь не проходит '
+            'аутентификацию'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_06_concurrent_insert(self, admin_client, monkeypatch):
+        from api.v1.serializers import BulkUserListSerializer
+        from users.models import CustomUser
+        check_unique = BulkUserListSerializer.check_unique
+        calls = []
+
+        def racing_check_unique(serializer, rows, errors):
+            check_unique(serializer, rows, errors)
+            if not calls:
+                # Другой запрос занимает email второй строки сразу
+                # после проверки уникальности
+                CustomUser.objects.create(username='racer',
+                                          email='race1@yamdb.fake')
+            calls.append(rows)
+
+        monkeypatch.setattr(BulkUserListSerializer, 'check_unique',
+                            racing_check_unique)
+        count = CustomUser.objects.count()
+        response = admin_client.post(f'{URL}create/', data=rows(3, 'race'),
+                                     format='json')
+        assert response.status_code == 400, (
+            'Проверьте, что одновременная вставка тех же данных '
+            'возвращает ошибки по строкам, а не ошибку сервера'
+        )
+        errors = response.json()
+        assert errors[0] == {} and errors[2] == {}
+        assert list(errors[1]) == ['email']
+        assert CustomUser.objects.count() == count + 1, (
+            'Проверьте, что при конфликте не создаётся ни одна строка пачки'
+        )
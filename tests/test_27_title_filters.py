@@ -0,0 +1,82 @@
+import pytest
+
+from .common import create_titles
+
+
+class Test27TitleFilters:
+
+    def names(self, client, query):
+        response = client.get(f'/api/v1/titles/?{query}')
+        assert response.status_code == 200, (
+            f'Проверьте, что GET запрос `/api/v1/titles/?{query}` возвращает статус 200'
+        )
+        data = response.json()
+        names = [title['name'] for title in data['results']]
+        assert data['count'] == len(names), (
+            f'Проверьте, что `count` для `{query}` совпадает с числом '
+            'произведений в выдаче'
+        )
+        return sorted(names)
+
+    def create_catalog(self, admin_client):
+        titles, categories, genres = create_titles(admin_client)
+        response = admin_client.post('/api/v1/titles/', data={
+            'name': 'Третий', 'year': 2010,
+            'genre': [genres[0]['slug'], genres[2]['slug']],
+            'category': categories[0]['slug'],
+        })
+        admin_client.post(f'/api/v1/titles/{response.json()["id"]}/reviews/',
+                          data={'text': 'Отлично', 'score': 9})
+        return titles, categories, genres
+
+    @pytest.mark.django_db(transaction=True)
+    def test_01_genres(self, client, admin_client):
+        self.create_catalog(admin_client)
+        assert self.names(client, 'genre=horror,comedy') == [
+            'Поворот туда', 'Третий'
+        ], (
+            'Проверьте, что `genre` со списком жанров возвращает каждое '
+            'произведение один раз'
+        )
+        assert self.names(client, 'genre=horror,comedy&genre_match=all') == [
+            'Поворот туда'
+        ], (
+            'Проверьте, что `genre_match=all` оставляет произведения '
+            'со всеми указанными жанрами'
+        )
+        assert self.names(client, 'genre=drama,horror&genre_match=all') == [
+            'Третий'
+        ]
+        assert self.names(client, 'genre=horror,horror&genre_match=all') == [
+            'Поворот туда', 'Третий'
+        ]
+        assert self.names(client, 'genre=drama') == ['Проект', 'Третий']
+        assert self.names(client, 'genre=missing') == []
+        response = client.get('/api/v1/titles/?genre=drama&genre_match=some')
+        assert response.status_code == 400, (
+            'Проверьте, что неизвестное значение `genre_match` отклоняется'
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_02_ranges(self, client, admin_client):
+        self.create_catalog(admin_client)
+        assert self.names(client, 'year_min=2005') == ['Проект', 'Третий']
+        assert self.names(client, 'year_min=2005&year_max=2010') == [
+            'Третий'
+        ], 'Проверьте, что `year_min` и `year_max` включают границы'
+        assert self.names(client, 'category__in=films,books') == [
+            'Поворот туда', 'Проект', 'Третий'
+        ]
+        assert self.names(client, 'category__in=books,missing') == ['Проект']
+        everything = self.names(client, '')
+        for query in ('category__in=,', 'genre=,'):
+            assert self.names(client, query) == everything, (
+                f'Проверьте, что пустой список в `{query}` не фильтрует '
+                'произведения'
+            )
+        assert self.names(client, 'rating_min=8') == ['Третий'], (
+            'Проверьте, что `rating_min` отбирает произведения по рейтингу'
+        )
+        assert self.names(
+            client, 'category__in=films&genre=horror&year_max=2005'
+        ) == ['Поворот туда']